@@ -0,0 +1,166 @@
+"""
+Benchmarks building and storing synthetic documents of growing size, one feature at a time, as markdown and as
+HTML. Reports the time to store each document, the throughput and the peak memory of building and storing it,
+and compares them to a stored baseline.
+
+    python bench/run.py                       Run and compare to bench/baseline.json if it exists
+    python bench/run.py --save                Run and store the results as the baseline
+    python bench/run.py --sizes 1000 10000    Run with other document sizes
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markitdown import Document
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def weights(size):
+    document = Document()
+    for i in range(size):
+        document.text(f"ord {i}").bold().nospace().italic("kursiv").strikethrough().inlinecode("kod")
+    return document
+
+
+def table(size):
+    document = Document()
+    document.table(["id", "namn", "värde"]).add_rows([[i, f"namn {i}", i * 0.5] for i in range(size)])
+    return document
+
+
+def nested_list(size):
+    document = Document()
+    md_list = document.unordered_list()
+    depth = 0
+    for i in range(size):
+        md_list.add_item(f"punkt {i}")
+        if i % 10 == 0 and depth < 8:
+            md_list = md_list.unordered_list() if depth % 2 else md_list.ordered_list()
+            md_list.add_item(f"under {i}")
+            depth += 1
+        elif i % 10 == 5 and depth > 0:
+            md_list = md_list.get_parent()
+            depth -= 1
+    return document
+
+
+def quote(size):
+    document = Document()
+    for i in range(size):
+        document.quote(f"citat nummer {i} med lite text")
+    return document
+
+
+def checkbox(size):
+    document = Document()
+    for i in range(size):
+        document.checkbox(f"uppgift {i}", checked=i % 2 == 0)
+    return document
+
+
+def code_block(size):
+    return Document().fenced_code_block("\n".join(f"rad {i} = {i * 2}" for i in range(size)))
+
+
+FEATURES = {
+    'weights': weights,
+    'table': table,
+    'nested_list': nested_list,
+    'quote': quote,
+    'checkbox': checkbox,
+    'code_block': code_block,
+}
+OUTPUTS = ('markdown', 'html')
+
+
+def store(document, directory, output):
+    document.file_name = 'bench.html' if output == 'html' else 'bench.md'
+    document.file_path = directory
+    document.store_document(html=output == 'html')
+    return os.path.getsize(os.path.join(directory, document.file_name))
+
+
+def measure(build, size, output, directory, repeat):
+    """
+    :return: The best time of storing a freshly built document, the size of the stored file and the peak memory
+        of building and storing the document once
+    """
+    seconds = None
+    for _ in range(repeat):
+        document = build(size)
+        start = time.perf_counter()
+        written = store(document, directory, output)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    tracemalloc.start()
+    store(build(size), directory, output)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, written, peak
+
+
+def compare(results, baseline, tolerance):
+    """
+    :return: The names of the measurements that are slower or use more memory than the baseline allows
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('seconds', 'peak_bytes'):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {base[key]:.6g} -> {result[key]:.6g}")
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark rendering of markitdown documents")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--features', nargs='+', choices=sorted(FEATURES), default=list(FEATURES))
+    parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs, the best one is reported")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown or memory growth compared to the baseline, 0.25 is 25%%")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help="Store the results as the baseline")
+    options = parser.parse_args(arguments)
+
+    results = {}
+    print(f"{'benchmark':<32}{'seconds':>10}{'items/s':>12}{'MB/s':>9}{'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for feature in options.features:
+            for output in OUTPUTS:
+                for size in options.sizes:
+                    name = f"{feature}/{output}/{size}"
+                    seconds, written, peak = measure(FEATURES[feature], size, output, directory, options.repeat)
+                    results[name] = {'seconds': seconds, 'bytes': written, 'peak_bytes': peak}
+                    print(f"{name:<32}{seconds:>10.4f}{size / seconds:>12.0f}{written / seconds / 1e6:>9.1f}"
+                          f"{peak / 1e6:>9.1f}")
+
+    if options.save:
+        with open(options.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Stored baseline in {options.baseline}")
+        return 0
+    if not os.path.exists(options.baseline):
+        print("No baseline to compare with, store one with --save")
+        return 0
+    with open(options.baseline) as file:
+        regressions = compare(results, json.load(file), options.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import collections.abc
+import contextlib
+import contextvars
+import functools
+import html
+import inspect
+import io
+import itertools
+import json
+import mmap
+import operator
 import os.path
+import pickle
+import re
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
 from fileinput import filename
-from typing import TypeVar, Iterable
-
-import markdown
-from bs4 import BeautifulSoup
+from typing import TypeVar, Iterable, Callable, NamedTuple
 
 TUnorderedList = TypeVar("TUnorderedList", bound="UnorderedList")
 TOrderedList = TypeVar("TOrderedList", bound="OrderedList")
@@ -17,46 +32,309 @@ class FormatingException(Exception):
         super().__init__(message)
 
 
-class DocText:
-    parent_feature = None
-    render_spaces=None
+# Translation tables escaping user text in a single pass, for running text, for text that has to stay on one line
+# (table cells and headings) and for inline code, where only line breaks can be escaped, and pipes in table cells
+_TEXT_ESCAPE = str.maketrans({char: f'&#{ord(char)};' for char in '\\`*_[]<>|~#&='})
+_LINE_ESCAPE = str.maketrans({**{char: f'&#{ord(char)};' for char in '\\`*_[]<>|~#&='}, '\n': ' ', '\r': ' '})
+_CODE_SPAN_ESCAPE = str.maketrans({'\n': ' ', '\r': ' '})
+_TABLE_CODE_SPAN_ESCAPE = str.maketrans({'\n': ' ', '\r': ' ', '|': '\\|'})
+
+
+class LineWrap:
+    """
+    How the markdown of running text is broken into lines. The wrapping is done on the rendered pieces of a text
+    as they are produced, pieces that do not reach a break are passed through untouched.
+
+    :param words: Start a new line after every words:th space
+    :param width: Break lines at spaces so that they are at most width characters long, words longer than the
+        width are kept on a line of their own
+    Without words or width the text is not wrapped at all.
+    """
+    __slots__ = ('words', 'width')
+
+    def __init__(self, words: int = None, width: int = None):
+        if words is not None and width is not None:
+            raise FormatingException("Wrap either by words or by width, not both")
+        if (words is not None and words < 1) or (width is not None and width < 1):
+            raise FormatingException("The wrap size must be at least 1")
+        self.words = words
+        self.width = width
+
+    def wrap(self, pieces: Iterable[str]) -> str:
+        return ''.join(self.iter_wrap(pieces))
+
+    def iter_wrap(self, pieces: Iterable[str]) -> Iterable[str]:
+        """
+        :return: The wrapped pieces, produced as the pieces are read
+        """
+        if self.words is not None:
+            return self._wrap_words(pieces, self.words)
+        if self.width is not None:
+            return self._wrap_width(pieces, self.width)
+        return pieces
+
+    @staticmethod
+    def _wrap_words(pieces, words):
+        spaces = 0
+        for piece in pieces:
+            count = piece.count(' ')
+            if spaces % words + count < words:
+                spaces += count
+                yield piece
+                continue
+            start = search = 0
+            while True:
+                position = piece.find(' ', search)
+                if position < 0:
+                    break
+                spaces += 1
+                search = position + 1
+                if spaces % words == 0:
+                    yield piece[start:search]
+                    yield '\n'
+                    start = search
+            yield piece[start:]
+
+    @staticmethod
+    def _wrap_width(pieces, width):
+        # The space in front of the word being collected is held back, since it is the one replaced by a line
+        # break if the word does not fit on the line
+        line = 0
+        word = []
+        word_length = 0
+        space = False
+        for piece in itertools.chain(pieces, (None,)):
+            if piece is not None and line + space + word_length + len(piece) <= width and '\n' not in piece:
+                # Everything up to the end of the piece fits on the line, only its last word is held back since it
+                # can go on in the next piece
+                last = piece.rfind(' ')
+                if last < 0:
+                    word.append(piece)
+                    word_length += len(piece)
+                    continue
+                if space:
+                    yield ' '
+                    line += 1
+                for fragment in word:
+                    yield fragment
+                    newline = fragment.rfind('\n')
+                    line = line + len(fragment) if newline < 0 else len(fragment) - newline - 1
+                if last:
+                    yield piece[:last]
+                    line += last
+                word_length = len(piece) - last - 1
+                word = [piece[last + 1:]] if word_length else []
+                space = True
+                continue
+            start = 0
+            while True:
+                position = -1 if piece is None else piece.find(' ', start)
+                if piece is not None:
+                    fragment = piece[start:] if position < 0 else piece[start:position]
+                    if fragment:
+                        word.append(fragment)
+                        word_length += len(fragment)
+                    if position < 0:
+                        break
+                if space:
+                    if word and line > 0 and line + 1 + word_length > width:
+                        yield '\n'
+                        line = 0
+                    else:
+                        yield ' '
+                        line += 1
+                if word:
+                    yield from word
+                    for fragment in word:
+                        newline = fragment.rfind('\n')
+                        line = line + len(fragment) if newline < 0 else len(fragment) - newline - 1
+                    word = []
+                    word_length = 0
+                space = piece is not None
+                if piece is None:
+                    break
+                start = position + 1
+
+
+# The wrapping of running text unless a document or text says otherwise, a line break after every tenth word
+DEFAULT_WRAP = LineWrap(words=10)
+
+
+# What is being rendered. By default rendering fills the caches of the rendered objects. While a document is
+# streamed to a file the caches are used but not filled, they would hold a second copy of everything written. While
+# a template is compiled the caches are not used at all, since the text is rendered with the slots marked
+_RENDERING = contextvars.ContextVar('_RENDERING', default='cache')
+
+
+@contextlib.contextmanager
+def _rendering(mode: str):
+    token = _RENDERING.set(mode)
+    try:
+        yield
+    finally:
+        _RENDERING.reset(token)
+
+
+# The mark put after the start of a Slot while a template is compiled, telling how the text around it was escaped.
+# Slots in fenced code blocks are not escaped and are not marked
+_SLOT_MARKS = {id(_TEXT_ESCAPE): 't', id(_LINE_ESCAPE): 'l', id(_CODE_SPAN_ESCAPE): 'k',
+               id(_TABLE_CODE_SPAN_ESCAPE): 'K'}
+
+
+def _escape(text: str, table: dict) -> str:
+    if '\x02' in text and _RENDERING.get() == 'compile':
+        text = text.replace('\x02', '\x02' + _SLOT_MARKS[id(table)])
+    return text.translate(table)
+
+
+class _Covered:
+    """
+    The cache of a sub list whose markdown is cached as part of the list containing it.
+    """
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_COVERED'
+
+
+_COVERED = _Covered()
+
+
+class RenderCache:
+    """
+    Memoizes the rendered markdown of a model object. The cache is dropped when the object, or any object it
+    contains, is mutated. Streaming a document to a file uses the caches but does not fill them.
+    An object only has a cache while the objects inside it that contain others have one too, so dropping the
+    caches stops at an owner that has none.
+    """
+    __slots__ = ('_rendered', '_owners')
+    # Whether the object can be sent to another process to be rendered
+    _parallel = True
+    # Whether rendering the object again gives the text it was written with, without producing its content again,
+    # so an incremental store_document can compare the two to find out if it has changed
+    _comparable = True
+
+    def __init__(self):
+        self._rendered = None
+        self._owners = []
+
+    def _own(self, obj):
+        """
+        Registers this object as containing obj, so that mutating obj also invalidates this object's cache.
+        """
+        if self not in obj._owners:
+            obj._owners.append(self)
+        return obj
+
+    def _invalidate(self):
+        # Walked with a stack rather than recursion, the owners of a text in a deeply nested list can be thousands
+        # of levels up. The owners of an owner without a cache have none either
+        self._rendered = None
+        stack = [self]
+        while stack:
+            for owner in stack.pop()._owners:
+                if owner._rendered is not None:
+                    owner._rendered = None
+                    stack.append(owner)
+
+    def _fill(self, rendered: str):
+        self._rendered = rendered
+
+    def _render(self):
+        mode = _RENDERING.get()
+        rendered = self._rendered
+        if rendered is None or rendered is _COVERED or mode == 'compile':
+            if mode != 'cache':
+                return self._render_markdown()
+            self._fill(self._render_markdown())
+        return self._rendered
+
+    def _iter_render(self):
+        """
+        Renders the object in chunks, blocks that can produce their markdown piece by piece override this.
+        """
+        yield self._render()
+
+    def _iter_render_html(self):
+        yield self._render_html()
+
+
+class DocText(RenderCache):
+    __slots__ = ('md_objects', '_parent_feature', 'dont_add_more_weights', '_wrap', '_nospace')
 
-    def __init__(self, parent_feature=None):
+    def __init__(self, parent_feature=None, wrap: LineWrap = None):
+        """
+        :param wrap: How the markdown of the text is broken into lines, DEFAULT_WRAP if None. Text in tables and
+            code blocks is never wrapped
+        """
+        super().__init__()
         self.md_objects = []
-        self.parent_feature = parent_feature
+        self._parent_feature = parent_feature
         self.dont_add_more_weights = False
+        self._wrap = wrap
+        # Whether the last span is a nospace() marker, the next span is then appended without a space in front
+        self._nospace = False
+
+    @property
+    def parent_feature(self):
+        return self._parent_feature
+
+    @parent_feature.setter
+    def parent_feature(self, parent_feature):
+        self._parent_feature = parent_feature
+        self._invalidate()
+
+    @property
+    def wrap(self) -> LineWrap:
+        return self._wrap
+
+    @wrap.setter
+    def wrap(self, wrap: LineWrap):
+        self._wrap = wrap
+        self._invalidate()
 
     def _clear_weights(self):
         for i, obj in enumerate(reversed(self.md_objects)):
             new_obj = self._clear_weight(obj)
             self.md_objects[len(self.md_objects) - i - 1] = new_obj
+        self._invalidate()
 
 
-    def _clear_weight(self, obj):
-            top_obj = obj._find_top_parent()
-            top_obj.child = None
-            return top_obj.to_text()
+    @staticmethod
+    def _clear_weight(obj):
+        return obj.to_text()
 
     def _clear_inline_weight(self):
         top = self._clear_weight(self.md_objects[-1])
         self.md_objects[-1] = top
         self.dont_add_more_weights = True
 
+    def _append(self, formater):
+        formater._owner = self
+        if not isinstance(formater, NoSpace):
+            formater._separator = '' if self._nospace else ' '
+            self._nospace = False
+        elif formater.text_str is None:
+            self._nospace = True
+        self.md_objects.append(formater)
+
     def _add_weight(self, func: str, text=None):
-        call_function = func
         if text is None:
-            if len(self.md_objects) > 0:
-                if call_function == 'inlinecode':
+            if func == 'nospace':
+                self._append(NoSpace())
+            elif len(self.md_objects) > 0:
+                if func == 'inlinecode':
                     self._clear_inline_weight()
-                    getattr(self.md_objects[-1], call_function)()
+                    self.md_objects[-1].weight(func)
                 else:
                     if not self.dont_add_more_weights:
-                        getattr(self.md_objects[-1], call_function)()
+                        self.md_objects[-1].weight(func)
             else:
                 raise FormatingException("cannot add weight no previous text exists")
         else:
-            new_obj = StringFormater(text).init_class_by_name(func, text)
-            self.md_objects.append(new_obj)
+            new_obj = NoSpace(text) if func == 'nospace' else Text(text, _weight_flag(func))
+            self._append(new_obj)
+        self._invalidate()
         return self
 
     def text(self, text=None):
@@ -78,74 +356,254 @@ class DocText:
         return self._add_weight('important', text)
 
     def nospace(self, text: str = None):
-        if text is None:
-            self.md_objects.append(NoSpace(text))
-            return self
-        else:
-            return self._add_weight('nospace', text)
-        #
-        # return self
+        return self._add_weight('nospace', text)
 
-    @staticmethod
-    def _add_line_break(text, breakindex=10):
-        splited = text.split(' ')
-        if len(splited) > breakindex:
-            for i, k in enumerate(splited):
-                if i > 0:
-                    if i % breakindex == 0:
-                        splited[i] = '\n' + splited[i]
+    def weight(self, name: str, text=None):
+        """
+        Adds a weight by name, including weights added with register_weight
+        :param name: Name of the weight for example 'bold'
+        """
+        return self._add_weight(name, text)
 
-        return ' '.join(splited)
+    def _render(self, leading_nospace=False):
+        """
+        :param leading_nospace: Render without the space in front of the first text, as if the text started with
+            a nospace()
+        """
+        if leading_nospace:
+            return self._render_markdown(leading_nospace)
+        return super()._render()
 
-    def _render(self):
-        md_str = ''
-        nospace = False
-        for i, formater in enumerate(self.md_objects):
-            if not isinstance(formater, NoSpace) and not nospace:
-                md_text = formater._render()
-                md_str = md_str + ' ' + md_text
-            elif not isinstance(formater, NoSpace) and nospace:
-                md_text = formater._render()
-                md_str = md_str + md_text
-                nospace = False
-            elif isinstance(formater, NoSpace) and formater.text_str is not None:
-                md_text = formater._render()
-                md_str = md_str + md_text
-                # nospace=True
-            else:
-                nospace = True
-        if self.parent_feature == Table and self.render_spaces is not None:
-                spaces=''
-                emptylist = [' ' for r in range(0,self.render_spaces)]
-                orig_word = md_str
-                spaces = spaces.join(emptylist)
-                new_word = f'{orig_word}{spaces}'
-                new_break_index = len(new_word)
-        else:
-            new_break_index = 10
-            new_word = md_str
+    def _iter_render(self, leading_nospace=False):
+        yield self._render(leading_nospace)
 
-        if self.parent_feature != FencedCodeBlock:
-            new_md_string = self._add_line_break(new_word,breakindex=new_break_index)
+    def _iter_render_html(self, leading_nospace=True):
+        yield self._render_html(leading_nospace)
+
+    def _join_spans(self, render, leading_nospace=False):
+        """
+        Renders the spans, yielding the rendered spans and the spaces between them as separate pieces.
+        """
+        for formater in self.md_objects:
+            separator = formater._separator
+            if separator is None:
+                continue
+            if leading_nospace and not isinstance(formater, NoSpace):
+                separator = ''
+                leading_nospace = False
+            if separator:
+                yield separator
+            yield render(formater)
+
+    def _render_html(self, leading_nospace=True):
+        return ''.join(self._join_spans(TextFormater._render_html, leading_nospace))
+
+    def _iter_markdown(self, leading_nospace=False, feature=None):
+        """
+        :param feature: Render the text as part of this feature instead of its parent_feature
+        """
+        feature = self.parent_feature if feature is None else feature
+        if feature == FencedCodeBlock:
+            render = TextFormater._render_raw
         else:
-            new_md_string = new_word
-        return new_md_string
+            if feature == Table:
+                render = operator.methodcaller('_render', _LINE_ESCAPE, _TABLE_CODE_SPAN_ESCAPE)
+            else:
+                render = operator.methodcaller('_render', _TEXT_ESCAPE, _CODE_SPAN_ESCAPE)
+        pieces = self._join_spans(render, leading_nospace)
+        if feature == FencedCodeBlock:
+            return pieces
+        if feature == Table:
+            return _guard_markup(pieces, line_start=False)
+        return _guard_markup((DEFAULT_WRAP if self.wrap is None else self.wrap).iter_wrap(pieces))
+
+    def _render_markdown(self, leading_nospace=False, feature=None):
+        return ''.join(self._iter_markdown(leading_nospace, feature))
+
+
+# A list marker at the start of a line, where it would start a list or, as a row of dashes, a heading or a rule
+_LINE_START_MARKER = re.compile(r'\A([ \t]*)(?:([-+])(?=[ \t-]|$)|(\d{1,9})([.)])(?=[ \t]|$))')
+# The start of a line that can still become a list marker, depending on what follows it
+_BARE_MARKER = re.compile(r'[ \t]*(?:[-+]|\d{1,9}[.)]?)')
+# The start of a line in a code span that could start a block
+_CODE_LINE_START = re.compile(r'[ \t]*(?:[-+*_=#>|~<]|\d)')
+_BACKTICKS = re.compile('`+')
+# Written between code spans that touch, their backticks would otherwise run together
+_CODE_SPAN_SEPARATOR = '<!---->'
+
+
+def _escape_marker(match: re.Match) -> str:
+    if match.group(2) is not None:
+        return match.group(1) + f'&#{ord(match.group(2))};'
+    return match.group(1) + match.group(3) + f'&#{ord(match.group(4))};'
+
+
+def _guard_markup(pieces: Iterable[str], line_start=True) -> Iterable[str]:
+    """
+    Keeps the rendered pieces of a text from being read as other markup when they are joined, escaping list markers
+    at the start of the lines and separating code spans that touch. Inside a code span nothing can be escaped, a line
+    is not broken there in front of a character that could start a block.
+    :param line_start: Whether the text starts at the start of a line
+    """
+    last = ''
+    # The start of a line that is held back, since whether it is a marker depends on what the next piece starts with
+    carry = ''
+    # The length of the backtick run that opened the code span the text is in
+    code = 0
+    for piece in pieces:
+        if not piece:
+            continue
+        if carry:
+            piece, carry = carry + piece, ''
+        elif last == '`' and piece[0] == '`':
+            yield _CODE_SPAN_SEPARATOR
+        if line_start or '\n' in piece or '`' in piece:
+            parts = []
+            lines = piece.split('\n')
+            for index, line in enumerate(lines):
+                if index:
+                    parts.append('\n')
+                    line_start = True
+                if line_start and line.strip(' \t'):
+                    if code:
+                        if index and _CODE_LINE_START.match(line):
+                            before = parts[-2][-1:] if parts[-2] else last
+                            parts[-1] = '' if before == ' ' else ' '
+                    elif index == len(lines) - 1 and _BARE_MARKER.fullmatch(line):
+                        parts.append(line)
+                        break
+                    else:
+                        line = _LINE_START_MARKER.sub(_escape_marker, line, count=1)
+                    line_start = False
+                parts.append(line)
+                if '`' in line:
+                    for run in _BACKTICKS.finditer(line):
+                        length = run.end() - run.start()
+                        if not code:
+                            code = length
+                        elif length == code:
+                            code = 0
+            if line_start:
+                carry = parts.pop()
+                if parts and parts[-1] == '\n':
+                    carry = parts.pop() + carry
+            piece = ''.join(parts)
+        if piece:
+            last = piece[-1]
+            yield piece
+    if carry:
+        newline = carry.rfind('\n') + 1
+        yield carry[:newline] + _LINE_START_MARKER.sub(_escape_marker, carry[newline:], count=1)
+
+
+def _is_lazy(content) -> bool:
+    """
+    :return: Whether content is produced on demand, by a function or an iterator such as a generator
+    """
+    return callable(content) or isinstance(content, collections.abc.Iterator)
+
+
+def _produce(content) -> Iterable:
+    content = content() if callable(content) else content
+    return (content,) if isinstance(content, (str, DocText)) else content
+
+
+class LazyText(DocText):
+    """
+    Text starting with spans that are only produced while the document is rendered, one span per string from the
+    source. Weights added before any other text are given to the produced spans, text added afterwards is rendered
+    after them.
+    """
+    __slots__ = ('source', '_leading_nospace', '_weights')
+    _parallel = False
+    _comparable = False
+
+    def __init__(self, source: Iterable[str] | Callable[[], Iterable[str] | str], wrap: LineWrap = None,
+                 nospace=False):
+        """
+        :param nospace: Start without a space in front of the first span, like a DocText starting with nospace()
+        """
+        super().__init__(wrap=wrap)
+        self.source = source
+        self._leading_nospace = nospace
+        # The weights of the produced spans
+        self._weights = 0
+
+    def _add_weight(self, func: str, text=None):
+        if text is not None or func == 'nospace' or len(self.md_objects) > 0:
+            return super()._add_weight(func, text)
+        if func == 'inlinecode':
+            self._weights = WEIGHTS['inlinecode']
+            self.dont_add_more_weights = True
+        elif not self.dont_add_more_weights:
+            flag = _weight_flag(func)
+            if self._weights & flag:
+                raise FormatingException('Can only add weight once')
+            self._weights |= flag
+        self._invalidate()
+        return self
+
+    def _render(self, leading_nospace=False):
+        return self._render_markdown(leading_nospace)
+
+    def _iter_render(self, leading_nospace=False):
+        return self._iter_markdown(leading_nospace)
+
+    def _iter_render_html(self, leading_nospace=True):
+        return self._join_spans(TextFormater._render_html, leading_nospace)
+
+    def _join_spans(self, render, leading_nospace=False):
+        leading_nospace = leading_nospace or self._leading_nospace
+        for text in _produce(self.source):
+            if leading_nospace:
+                leading_nospace = False
+            else:
+                yield ' '
+            yield render(Text(text, self._weights))
+        yield from super()._join_spans(render, leading_nospace)
 
 
 class Document:
+    __slots__ = ('md_objects', 'file_name', 'file_path', 'wrap', 'stats', '_flushed')
 
-    def __init__(self, file_name=None,file_path=None):
+    def __init__(self, file_name=None,file_path=None, wrap: LineWrap = None, stats: RenderStats = None):
+        """
+        :param wrap: How the text the document creates from strings is broken into lines, DEFAULT_WRAP if None
+        :param stats: Record render timings of the document in this object, rendering is not measured without it
+        """
         self.md_objects = []
         self.file_name = file_name
         self.file_path = file_path
+        self.wrap = wrap
+        self.stats = stats
+        # What an incremental store_document has written so far
+        self._flushed = None
+
+    def _doc_text(self, text: DocText | str) -> DocText:
+        return DocText(wrap=self.wrap).text(text) if isinstance(text, str) else text
+
+    @classmethod
+    def load(cls, path: str, wrap: LineWrap = None) -> Document:
+        """
+        Reads a markdown file, for example a report stored earlier, into a document that can be amended and stored
+        again in its place. The file is parsed line by line into headings, text, quotes, checkboxes, lists, tables,
+        code blocks and horizontal rules, with the weights written by markitdown. Markdown it cannot represent is
+        kept as plain text.
+        :param wrap: How the text of the document is wrapped when it is stored again
+        """
+        file_path, file_name = os.path.split(path)
+        document = cls(file_name=file_name, file_path=file_path or None, wrap=wrap)
+        with open(path) as file:
+            _MarkdownReader(document).read(file)
+        return document
 
     def quote(self, doctext: DocText|str):
-        quote = Quote(doctext)
+        quote = Quote(self._doc_text(doctext))
         self.md_objects.append(quote)
         return self
 
     def checkbox(self, doctext: DocText | str, checked=False):
-        chkbox = TextCheckbox(doctext, checked)
+        chkbox = TextCheckbox(self._doc_text(doctext), checked)
         self.md_objects.append(chkbox)
         return self
 
@@ -154,8 +612,12 @@ class Document:
         self.md_objects.append(heading)
         return self
 
-    def unordered_list(self):
-        unordered_list = UnorderedList()
+    def unordered_list(self, items: Iterable[DocText | str] | Callable[[], Iterable[DocText | str]] = None):
+        """
+        :param items: A generator, or a function returning the items, to produce the first items of the list only
+            while the document is rendered. Without items the list is filled with add_item.
+        """
+        unordered_list = UnorderedList() if items is None else LazyUnorderedList(items)
         unordered_list.parent_document = self
         self.md_objects.append(unordered_list)
         return unordered_list
@@ -166,10 +628,40 @@ class Document:
         self.md_objects.append(ordered_list)
         return ordered_list
 
-    def table(self, headers):
+    def table(self, headers, rows: Iterable[Iterable] | Callable[[], Iterable[Iterable]] = None):
+        """
+        :param rows: Rows to add to the table. Rows from a generator or a function are only read while the document
+            is rendered, the table is then a compact StreamingTable, see streaming_table.
+        :return: The table, get_parent() returns the document
+        """
+        if _is_lazy(rows):
+            return self.streaming_table(headers, rows).md_objects[-1]
         table = Table(headers)
         table.parent_document = self
         self.md_objects.append(table)
+        if rows is not None:
+            table.add_rows(rows)
+        return table
+
+    def streaming_table(self, headers: Iterable, rows: Iterable[Iterable] | Callable[[], Iterable[Iterable]],
+                        width: int | Iterable[int] = None):
+        """
+        Adds a table whose rows are only read while the document is rendered, so they never have to be held in
+        memory. Since the columns cannot be measured up front they are either padded to a fixed width or not
+        padded at all.
+        :param rows: An iterable of rows, for example a generator or a database cursor, or a function returning
+            one. An iterator can only be rendered once, pass a function to be able to render the document again.
+        :param width: The width of every column, or one width per column. Without a width the table is compact.
+        """
+        table = StreamingTable(headers, rows, width)
+        table.parent_document = self
+        self.md_objects.append(table)
+        return self
+
+    def table_from_columns(self, columns: dict):
+        table = Table.from_columns(columns)
+        table.parent_document = self
+        self.md_objects.append(table)
         return table
 
     def horizontal_rule(self):
@@ -177,17 +669,40 @@ class Document:
         self.md_objects.append(hr)
         return self
 
-    def fenced_code_block(self, text: str | DocText):
-        code_block = FencedCodeBlock(text)
+    def fenced_code_block(self, text: str | DocText | Iterable[str] | Callable[[], Iterable[str] | str]):
+        """
+        :param text: The code, or a generator or function producing it while the document is rendered, one or
+            more lines at a time
+        """
+        code_block = LazyFencedCodeBlock(text) if _is_lazy(text) else FencedCodeBlock(text)
         self.md_objects.append(code_block)
         return self
 
+    def raw_code_block(self, payload: str | os.PathLike | memoryview | mmap.mmap | bytes, encoding='utf-8'):
+        """
+        Adds a code block whose code is copied as is from a file or a buffer while the document is rendered, for
+        large payloads like logs that should not be loaded into memory.
+        :param payload: The path of a file, or a memoryview, mmap or bytes
+        :param encoding: Encoding of the payload
+        """
+        self.md_objects.append(RawCodeBlock(payload, encoding))
+        return self
+
     def linebreak(self,amount=1):
         for _ in range(0,amount):
             self.md_objects.append(Break())
         return self
 
     def text(self, text_str=None):
+        """
+        :param text_str: The text, or a generator or function producing the text while the document is rendered.
+            Weights added right after produced text are given to all of it.
+        """
+        if _is_lazy(text_str):
+            # Like text from a string, text after another kind of block starts without a space
+            nospace = len(self.md_objects) > 0 and not isinstance(self.md_objects[-1], DocText)
+            self.md_objects.append(LazyText(text_str, wrap=self.wrap, nospace=nospace))
+            return self
         return self._call_by_text('text', text_str)
 
     def bold(self, text_str=None):
@@ -213,47 +728,315 @@ class Document:
     def important(self,text_str=None):
         return self._call_by_text('important', text_str)
 
-    def render_document_text(self):
-        document = ''
+    def weight(self, name: str, text_str=None):
+        return self._call_by_text(name, text_str)
+
+    def _separator(self, previous, md):
+        return self._separator_of(type(previous), type(md), type(self.md_objects[-1]))
+
+    @staticmethod
+    def _separator_of(previous: type, md: type, last: type):
+        """
+        The separator written in front of a block, decided by the types of the block, the previous block and the
+        last block of the document.
+        """
+        separator = ''
+        if issubclass(previous, Quote) or issubclass(last, MDlist):
+            separator = separator + '\n\n'
+        if issubclass(previous, TextCheckbox) and issubclass(md, DocText):
+            separator = separator + '\n\n'
+        if issubclass(previous, MDlist):
+            separator = separator + '\n'
+        return separator
+
+    def _iter_block(self, previous, md):
+        if isinstance(previous, TextCheckbox) and isinstance(md, DocText):
+            chunks = md._iter_render(leading_nospace=True)  # No beginning space if previous obj is TextCheckbox
+        else:
+            chunks = md._iter_render()
+        return chunks if self.stats is None else self.stats._measure('markdown', md, chunks)
+
+    def iter_render(self):
+        """
+        Renders the document block by block.
+        :return: A generator yielding the markdown of the document in chunks
+        """
+        previous = None
         for i, md in enumerate(self.md_objects):
             if i > 0:
-                if isinstance(self.md_objects[i - 1], Quote) or isinstance(self.md_objects[-1], MDlist):
-                    document = document + '\n\n'
-                if isinstance(self.md_objects[i - 1], TextCheckbox) and isinstance(md, DocText):
-                    md.md_objects.insert(0, NoSpace())  # No beginning space if previous obj is TextCheckbox
-                    document = document + '\n\n'
-                if isinstance(self.md_objects[i - 1], MDlist):
-                    document = document + '\n'
-            document = document + md._render()
-        return document
+                separator = self._separator(previous, md)
+                if separator:
+                    yield separator
+            yield from self._iter_block(previous, md)
+            previous = md
+
+    def render_to(self, fp):
+        """
+        Writes the markdown of the document to a file object without building the whole document in memory.
+        :param fp: A writable text file object
+        """
+        self._write_blocks(fp)
+
+    def _write_blocks(self, fp, start=0, html=False, track=False):
+        """
+        Writes the blocks from start on, as markdown with the separators in front of them or as HTML.
+        :param track: Find the position in fp in front of the last block and the text written for it
+        :return: The position and the text of the last block if tracked. The text is None for blocks that cannot be
+            compared, the next incremental store writes them again.
+        """
+        with _rendering('stream'):
+            return self._write_blocks_from(fp, start, html, track)
+
+    def _write_blocks_from(self, fp, start, html, track):
+        previous = self.md_objects[start - 1] if start > 0 else None
+        last = len(self.md_objects) - 1
+        position = tail = None
+        for i in range(start, last + 1):
+            md = self.md_objects[i]
+            separator = self._separator(previous, md) if i > 0 and not html else ''
+            chunks = self._iter_block_html(md) if html else self._iter_block(previous, md)
+            if track and i == last:
+                position = fp.tell()
+                if md._comparable:
+                    tail = separator + ''.join(chunks)
+                    fp.write(tail)
+                    break
+            if separator:
+                fp.write(separator)
+            if isinstance(md, RawCodeBlock) and not html:
+                if self.stats is None:
+                    md._write_to(fp)
+                else:
+                    self.stats._measure_write(md, fp)
+            else:
+                for chunk in chunks:
+                    fp.write(chunk)
+            previous = md
+        return position, tail
 
-    def store_document(self,html=False):
-        content = self.render_document_text()
+    def _render_segment(self, index: int, html=False):
+        """
+        :return: A block rendered as it is written by _write_blocks
+        """
+        md = self.md_objects[index]
         if html:
+            return ''.join(self._iter_block_html(md))
+        previous = self.md_objects[index - 1] if index > 0 else None
+        separator = self._separator(previous, md) if index > 0 else ''
+        with _rendering('stream'):
+            return separator + ''.join(self._iter_block(previous, md))
+
+    def render_document_text(self, workers: int = None):
+        """
+        :param workers: Render the blocks in a pool of this many processes instead of in this process. Only
+            worth it for documents with many blocks that are expensive to render, like large tables and lists.
+        """
+        if workers is None:
+            return ''.join(self.iter_render())
+        return ''.join(self._iter_render_parallel(workers))
+
+    def _iter_render_parallel(self, workers: int):
+        tasks = []
+        previous = None
+        for i, md in enumerate(self.md_objects):
+            leading_nospace = isinstance(previous, TextCheckbox) and isinstance(md, DocText)
+            if md._parallel and (md._rendered is None or leading_nospace):
+                tasks.append((i, md, leading_nospace))
+            previous = md
+
+        rendered = {}
+        start = time.perf_counter()
+        if tasks:
+            chunk_size = -(-len(tasks) // (workers * 4))
+            chunks = [tasks[offset:offset + chunk_size] for offset in range(0, len(tasks), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                payloads = [_dumps_blocks([(md, leading_nospace) for _, md, leading_nospace in chunk])
+                            for chunk in chunks]
+                for chunk, texts in zip(chunks, executor.map(_render_blocks, payloads)):
+                    for (i, md, leading_nospace), text in zip(chunk, texts):
+                        rendered[i] = text
+                        if not leading_nospace:
+                            md._fill(text)
+        if self.stats is not None:
+            self.stats.parallel_seconds += time.perf_counter() - start
+            self.stats.parallel_blocks += len(tasks)
+
+        previous = None
+        for i, md in enumerate(self.md_objects):
+            if i > 0:
+                separator = self._separator(previous, md)
+                if separator:
+                    yield separator
+            if i in rendered:
+                yield rendered[i]
+            else:
+                yield from self._iter_block(previous, md)
+            previous = md
 
-            html_content = markdown.markdown(content,extensions=['tables'])
-            new_document = BeautifulSoup()
-            html_tag = new_document.new_tag('html')
-            head_tag = new_document.new_tag('head')
-            link_tag= new_document.new_tag('link')
-            link_tag.attrs['rel'] = "stylesheet"
-            link_tag.attrs['href'] = 'styles.css'
-            head_tag.insert(0,link_tag)
-            body_tag = new_document.new_tag('body')
-            html_tag.insert(0,head_tag)
-            new_document.insert(0,html_tag)
-            html_tag.insert(1,body_tag)
-
-            bf = BeautifulSoup(html_content,features="html.parser")
-            body_tag.insert(0,bf)
-
-            content = new_document.prettify(formatter="html5")
+    def _file_and_path(self):
         if self.file_path is not None:
-            file_and_path = os.path.join(self.file_path,self.file_name)
+            return os.path.join(self.file_path, self.file_name)
+        return self.file_name
+
+    def _iter_block_html(self, md):
+        if isinstance(md, DocText):
+            chunks = itertools.chain(('<p>',), md._iter_render_html(), ('</p>\n',))
         else:
-            file_and_path = self.file_name
-        with open(file_and_path, 'w') as file:
-            file.write(content)
+            chunks = md._iter_render_html()
+        return chunks if self.stats is None else self.stats._measure('html', md, chunks)
+
+    def iter_render_html(self):
+        """
+        Renders the body of the document as HTML block by block, without going through markdown.
+        :return: A generator yielding the HTML in chunks
+        """
+        for md in self.md_objects:
+            yield from self._iter_block_html(md)
+
+    def render_html_to(self, fp):
+        """
+        Writes the document as an HTML page to a file object without building the whole page in memory.
+        :param fp: A writable text file object
+        """
+        fp.write(HTML_HEAD)
+        self._write_blocks(fp, html=True)
+        fp.write(HTML_TAIL)
+
+    def _iter_html_page(self):
+        yield HTML_HEAD
+        yield from self.iter_render_html()
+        yield HTML_TAIL
+
+    def render_html(self, pretty=False):
+        """
+        :param pretty: Indent the page with BeautifulSoup, which has to be installed
+        :return: The document as an HTML page
+        """
+        content = HTML_HEAD + ''.join(self.iter_render_html()) + HTML_TAIL
+        if pretty:
+            from bs4 import BeautifulSoup
+
+            start = time.perf_counter()
+            content = BeautifulSoup(content, features="html.parser").prettify(formatter="html5")
+            if self.stats is not None:
+                self.stats.pretty_seconds += time.perf_counter() - start
+        return content
+
+    def _open(self, path, mode):
+        """
+        Opens a file to store the document in, measuring the time spent writing to it if there are stats.
+        """
+        file = open(path, mode)
+        return file if self.stats is None else _MeasuredFile(file, self.stats)
+
+    def store_document(self,html=False,pretty=False,incremental=False):
+        """
+        :param html: Store the document as an HTML page instead of markdown
+        :param pretty: Indent the HTML page with BeautifulSoup
+        :param incremental: Only write the blocks added since the document was last stored incrementally, appending
+            them to the file. The last block stored before is written again if it has changed since, or always when
+            its content is produced while rendering or copied from a file. The blocks before it have to stay as
+            they are. A markdown file is rewritten when the document starts or stops
+            ending with a list, since that changes the separators of the earlier blocks.
+        """
+        if incremental:
+            if pretty:
+                raise FormatingException("Cannot store a pretty HTML page incrementally")
+            self._store_incremental(html)
+            return
+        self._flushed = None
+        with self._open(self._file_and_path(), 'w') as file:
+            if html and pretty:
+                file.write(self.render_html(pretty=True))
+            elif html:
+                self.render_html_to(file)
+            else:
+                self.render_to(file)
+
+    def _store_incremental(self, html):
+        path = self._file_and_path()
+        blocks = len(self.md_objects)
+        list_last = blocks > 0 and isinstance(self.md_objects[-1], MDlist)
+        flushed = self._flushed
+        if (flushed is None or flushed.path != path or flushed.html != html or flushed.blocks == 0
+                or flushed.blocks > blocks or (not html and flushed.list_last != list_last)
+                or not os.path.exists(path)):
+            with self._open(path, 'w') as file:
+                if html:
+                    file.write(HTML_HEAD)
+                tail_offset, tail = self._write_blocks(file, html=html, track=True)
+                end = file.tell()
+                if html:
+                    file.write(HTML_TAIL)
+        else:
+            start = flushed.blocks - 1
+            with self._open(path, 'r+') as file:
+                if flushed.tail is None or self._render_segment(start, html) != flushed.tail:
+                    file.seek(flushed.tail_offset)
+                else:
+                    file.seek(flushed.end)
+                    start = start + 1
+                tail_offset, tail = flushed.tail_offset, flushed.tail
+                if start < blocks:
+                    tail_offset, tail = self._write_blocks(file, start, html, track=True)
+                end = file.tell()
+                if html:
+                    file.write(HTML_TAIL)
+                file.truncate()
+        self._flushed = _Flushed(path, html, blocks, list_last, tail_offset, tail, end)
+
+    async def astore_document(self, html=False, pretty=False, executor=None, incremental=False):
+        """
+        Like store_document, but renders and writes the document in an executor so the event loop is not
+        blocked.
+        :param executor: The executor to use, defaults to the event loop's default thread pool
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, functools.partial(self.store_document, html=html, pretty=pretty,
+                                                               incremental=incremental))
+
+    async def arender_to(self, writer, html=False, encoding='utf-8', executor=None):
+        """
+        Renders the document in an executor and writes it in chunks to an asynchronous writer, for example an
+        aiohttp response or an asyncio StreamWriter.
+        :param writer: An object with a write method, which may be a coroutine. If it has a drain coroutine it is
+            awaited after every chunk.
+        :param html: Write the document as an HTML page
+        :param encoding: Encoding of the chunks written, None writes str
+        :param executor: The executor to render in, defaults to the event loop's default thread pool
+        """
+        loop = asyncio.get_running_loop()
+        chunks = self._iter_html_page() if html else self.iter_render()
+
+        def next_batch():
+            batch = []
+            size = 0
+            with _rendering('stream'):
+                for chunk in chunks:
+                    batch.append(chunk)
+                    size = size + len(chunk)
+                    if size >= ASYNC_BATCH_SIZE:
+                        break
+            if not batch:
+                return None
+            content = ''.join(batch)
+            return content if encoding is None else content.encode(encoding)
+
+        while (content := await loop.run_in_executor(executor, next_batch)) is not None:
+            written = writer.write(content)
+            if inspect.isawaitable(written):
+                await written
+            if hasattr(writer, 'drain'):
+                await writer.drain()
+
+    def compile(self, html=False) -> Template:
+        """
+        Renders the document once into a template whose Slot placeholders are filled in every time it is rendered.
+        Lazy content is produced while compiling and is then part of the template.
+        :param html: Compile the document as an HTML page instead of markdown
+        """
+        with _rendering('compile'):
+            return Template(''.join(self._iter_html_page() if html else self.iter_render()), html)
 
     def _call_by_text(self, func: str, text_obj: str | DocText = None):
         """
@@ -265,48 +1048,37 @@ class Document:
         if len(self.md_objects) > 0:
             last_obj = self.md_objects[-1]
             if (not isinstance(last_obj, DocText) or isinstance(last_obj, TextCheckbox)) and isinstance(text_obj, str):
-                self.md_objects.append(DocText().nospace()._add_weight(func, text=text_obj))
+                self.md_objects.append(DocText(wrap=self.wrap).nospace()._add_weight(func, text=text_obj))
             elif isinstance(last_obj, TextCheckbox) and isinstance(last_obj.text_str, DocText):
-                getattr(last_obj.text_str, func)()
+                last_obj.text_str._add_weight(func)
             if isinstance(last_obj, DocText):
-                getattr(last_obj, func)(text_obj)
+                last_obj._add_weight(func, text_obj)
         else:
             if isinstance(text_obj, str):
-                self.md_objects.append(DocText()._add_weight(func, text=text_obj))
+                self.md_objects.append(DocText(wrap=self.wrap)._add_weight(func, text=text_obj))
 
         return self
 
-class Formater:
+HTML_HEAD = '<html>\n<head>\n<link rel="stylesheet" href="styles.css">\n</head>\n<body>\n'
+HTML_TAIL = '</body>\n</html>\n'
+# Number of characters rendered in the executor before they are handed to an asynchronous writer
+ASYNC_BATCH_SIZE = 64 * 1024
+# Number of bytes of a raw payload decoded at a time when it cannot be copied as is
+RAW_CHUNK_SIZE = 1024 * 1024
+
+
+class Formater(RenderCache):
+    __slots__ = ('parent', 'child', 'parent_document')
 
     def __init__(self):
+        super().__init__()
         self.parent = None
         self.child = None
         self.parent_document = None
 
     @staticmethod
-    def _text_escape(text: str):
-
-        escapeable_chars = ['*', '_', '|', '`']
-        escape_code = ['&#42;', '&#95;', '&#124;', '&#96;']
-        for i, char in enumerate(escapeable_chars):
-            text = text.replace(char, escape_code[i])
-        return text
-
-    def _find_last_child(self, obj=None):
-        if obj is None:
-            obj = self
-        if obj.child is None:
-            return obj
-        else:
-            return self._find_last_child(obj.child)
-
-    def _find_top_parent(self, obj=None):
-        if obj is None:
-            obj = self
-        if obj.parent is None or type(obj.parent) is StringFormater:
-            return obj
-        else:
-            return self._find_top_parent(obj.parent)
+    def _text_escape(text: str, table: dict = _TEXT_ESCAPE):
+        return _escape(text, table)
 
     def get_parent(self) -> TOrderedList | TUnorderedList | Document:
         if self.parent is not None:
@@ -321,6 +1093,7 @@ class Formater:
             raise FormatingException("There is no child-list")
 
 class FeatureFormater(Formater):
+    __slots__ = ('text',)
 
     def __init__(self, doctext: DocText | str):
         super().__init__()
@@ -330,100 +1103,303 @@ class FeatureFormater(Formater):
             self.text = doctext
         self.text.parent_feature = self.__class__
         self.text._clear_weights()
+        self._own(self.text)
 
 
 class Quote(FeatureFormater):
+    __slots__ = ()
+
     def __init__(self, doctext: DocText | str):
         super().__init__(doctext)
 
-    def _render(self):
+    def _render_markdown(self):
         return '\n\n> ' + self.text._render()
 
+    def _render_html(self):
+        return '<blockquote><p>' + self.text._render_html() + '</p></blockquote>\n'
+
 
 class FencedCodeBlock(FeatureFormater):
+    __slots__ = ()
 
     def __init__(self, doctext: DocText | str):
         super().__init__(doctext)
 
+    def _render_markdown(self):
+        code = self.text._render(leading_nospace=True)
+        fence = '```'
+        if fence in code:
+            # A longer fence than any run of backticks in the code keeps the block from being closed early
+            fence = '`' * (max(map(len, re.findall('`{3,}', code))) + 1)
+        return '\n\n' + fence + '\n' + code + '\n' + fence + '\n'
+
+    def _render_html(self):
+        return '<pre><code>' + self.text._render_html() + '</code></pre>\n'
+
+
+class LazyFencedCodeBlock(Formater):
+    """
+    A code block whose code is only produced while the document is rendered, the produced strings are written as
+    lines of their own. Since the fence is written before the code is read it cannot be widened, so the code must
+    not contain ```.
+    """
+    __slots__ = ('source',)
+    _parallel = False
+    _comparable = False
+
+    def __init__(self, source: Iterable[str] | Callable[[], Iterable[str] | str]):
+        super().__init__()
+        self.source = source
+
+    def _iter_code(self, escape=None):
+        separator = ''
+        for code in _produce(self.source):
+            if '```' in code:
+                raise FormatingException("Cannot write ``` in a code block produced while rendering")
+            yield separator + (code if escape is None else escape(code, quote=False))
+            separator = '\n'
+
+    def _iter_render(self):
+        yield '\n\n```\n'
+        yield from self._iter_code()
+        yield '\n```\n'
+
+    def _render(self):
+        return ''.join(self._iter_render())
+
+    def _iter_render_html(self):
+        yield '<pre><code>'
+        yield from self._iter_code(html.escape)
+        yield '</code></pre>\n'
+
+    def _render_html(self):
+        return ''.join(self._iter_render_html())
+
+
+class RawCodeBlock(Formater):
+    """
+    A code block whose code is read from a file, a memoryview or an mmap while the document is rendered. Files are
+    mapped into memory rather than read. When the document is written to a binary backed file in the encoding of
+    the payload, the payload is copied straight into the file without being decoded.
+    """
+    __slots__ = ('payload', 'encoding')
+    _parallel = False
+    _comparable = False
+
+    def __init__(self, payload: str | os.PathLike | memoryview | mmap.mmap | bytes, encoding='utf-8'):
+        super().__init__()
+        self.payload = payload
+        self.encoding = encoding
+
+    @contextlib.contextmanager
+    def _open(self):
+        if not isinstance(self.payload, (str, os.PathLike)):
+            yield self.payload
+            return
+        with open(self.payload, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    @staticmethod
+    def _fence(buffer):
+        runs = [match.end() - match.start() for match in re.finditer(rb'`{3,}', buffer)]
+        return '`' * (max(runs) + 1) if runs else '```'
+
+    def _iter_decoded(self, buffer):
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        with memoryview(buffer) as view, view.cast('B') as data:
+            for start in range(0, len(data), RAW_CHUNK_SIZE):
+                text = decoder.decode(data[start:start + RAW_CHUNK_SIZE])
+                if text:
+                    yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+    def _copies_bytes(self, fp):
+        encoding = getattr(fp, 'encoding', None)
+        return (hasattr(fp, 'buffer') and encoding is not None
+                and codecs.lookup(encoding).name == codecs.lookup(self.encoding).name)
+
+    def _write_to(self, fp):
+        with self._open() as buffer:
+            fence = self._fence(buffer)
+            fp.write('\n\n' + fence + '\n')
+            if self._copies_bytes(fp):
+                fp.flush()
+                fp.buffer.write(buffer)
+            else:
+                for text in self._iter_decoded(buffer):
+                    fp.write(text)
+            fp.write('\n' + fence + '\n')
+
+    def _iter_render(self):
+        with self._open() as buffer:
+            fence = self._fence(buffer)
+            yield '\n\n' + fence + '\n'
+            yield from self._iter_decoded(buffer)
+            yield '\n' + fence + '\n'
+
     def _render(self):
-        self.text.md_objects.insert(0, NoSpace())
-        return '\n\n```\n' + self.text._render() + '\n```\n'
+        return ''.join(self._iter_render())
+
+    def _iter_render_html(self):
+        with self._open() as buffer:
+            yield '<pre><code>'
+            for text in self._iter_decoded(buffer):
+                yield html.escape(text, quote=False)
+            yield '</code></pre>\n'
+
+    def _render_html(self):
+        return ''.join(self._iter_render_html())
 
 
 class TextCheckbox(Formater):
+    __slots__ = ('text_str', '_checked')
 
     def __init__(self, doctext: DocText | str, checked=False):
         super().__init__()
         self.text_str = None
-        self.checked = checked
+        self._checked = checked
         if isinstance(doctext, DocText):
             self.text_str = doctext
         else:
             self.text_str = DocText().text(doctext)
+        self._own(self.text_str)
 
-    def _render(self):
+    @property
+    def checked(self) -> bool:
+        return self._checked
+
+    @checked.setter
+    def checked(self, checked: bool):
+        self._checked = checked
+        self._invalidate()
+
+    def _render_markdown(self):
         prefix = ' \n - [x] ' if self.checked else ' \n - [ ] '
         return prefix + self.text_str._render()
 
+    def _render_html(self):
+        checkbox = '<input type="checkbox" disabled checked>' if self.checked else '<input type="checkbox" disabled>'
+        return '<p class="checkbox">' + checkbox + ' ' + self.text_str._render_html() + '</p>\n'
+
+
+@functools.lru_cache(maxsize=1024)
+def _list_indent(level: int) -> str:
+    return '\t' * level
+
 
 class MDlist(Formater):
+    __slots__ = ('items', 'invocation_level', 'block_addition')
+    _ordered = False
 
     def __init__(self):
         super().__init__()
         self.items = []
         self.invocation_level = 0
-        self.items_counter = 0
         self.block_addition = False
 
     def add_item(self, text: DocText | str) -> TMDlist:
         if not self.block_addition:
             if isinstance(text, str):
-                self.items.append(DocText().text(text))
+                self.items.append(self._own(self.parent_document._doc_text(text) if self.parent_document is not None
+                                            else DocText().text(text)))
             elif isinstance(text, DocText):
-                self.items.append(text)
+                self.items.append(self._own(text))
+            self._invalidate()
             return self
         else:
             raise FormatingException(
                 "Cannot do this since other non-list functions has been invoked after last item addition")
 
-    def unordered_list(self) -> TUnorderedList:
-
-        new_list = UnorderedList()
+    def _add_list(self, new_list: TMDlist) -> TMDlist:
         new_list.parent = self
-        self.child=new_list
+        self.child = new_list
         new_list.parent_document = self.parent_document
         new_list.invocation_level = self.invocation_level + 1
-        self.items.append(new_list)
+        self.items.append(self._own(new_list))
+        return new_list
+
+    def unordered_list(self) -> TUnorderedList:
+        new_list = self._add_list(UnorderedList())
+        self._invalidate()
         return new_list
 
     def ordered_list(self) -> TOrderedList:
-        new_list = OrderedList()
-        new_list.parent = self
-        self.child = new_list
-        new_list.parent_document = self.parent_document
-        new_list.invocation_level = self.invocation_level + 1
-        self.items.append(new_list)
+        new_list = self._add_list(OrderedList())
+        self._invalidate()
         return new_list
 
-    def _render(self) -> str:
-        doc_text = ''
-
-        for i, item in enumerate(self.items):
-            if isinstance(self, OrderedList) and not isinstance(item, MDlist):
-                self.items_counter += 1
-                doc_text = doc_text + ''.join(
-                    ['\t' for _ in range(0, self.invocation_level)]) + f'{self.items_counter}.{item._render()}\n'
-            elif isinstance(self, UnorderedList) and not isinstance(item, MDlist):
-                self.items_counter += 1
-                doc_text = doc_text + ''.join(['\t' for _ in range(0, self.invocation_level)]) + f'-{item._render()}\n'
+    def _iter_items(self):
+        return iter(self.items)
+
+    def _iter_markdown(self):
+        # The whole tree is rendered from here with an explicit stack instead of recursing into the sub lists, each
+        # frame holds a list, its remaining items and the number of its items rendered so far
+        if self.parent is None:
+            yield '\n\n'
+        stack = [[self, self._iter_items(), 0]]
+        while stack:
+            frame = stack[-1]
+            md_list = frame[0]
+            for item in frame[1]:
+                if isinstance(item, MDlist):
+                    stack.append([item, item._iter_items(), 0])
+                    break
+                frame[2] += 1
+                marker = f'{frame[2]}.' if md_list._ordered else '-'
+                yield _list_indent(md_list.invocation_level) + marker + item._render() + '\n'
             else:
-                doc_text = doc_text + item._render()
-        if self.parent is not None:
-            return doc_text
-        else:
-            return '\n\n' + doc_text
+                stack.pop()
+
+    def _render_markdown(self) -> str:
+        return ''.join(self._iter_markdown())
+
+    def _fill(self, rendered: str):
+        super()._fill(rendered)
+        # The sub lists are rendered as part of this list, marking them keeps their items invalidating this cache.
+        # A sub list with a cache has marked the lists inside it already
+        stack = [self]
+        while stack:
+            for item in stack.pop().items:
+                if isinstance(item, MDlist) and item._rendered is None:
+                    item._rendered = _COVERED
+                    stack.append(item)
+
+    def _iter_html(self):
+        # Rendered with an explicit stack like the markdown, each frame holds a list, its remaining items and
+        # whether the last <li> is still open. A sub list belongs to the item before it
+        yield self._html_start()
+        stack = [[self, self._iter_items(), False]]
+        while stack:
+            frame = stack[-1]
+            for item in frame[1]:
+                if isinstance(item, MDlist):
+                    yield ('\n' if frame[2] else '<li>\n') + item._html_start()
+                    frame[2] = True
+                    stack.append([item, item._iter_items(), False])
+                    break
+                yield ('</li>\n<li>' if frame[2] else '<li>') + item._render_html()
+                frame[2] = True
+            else:
+                stack.pop()
+                yield ('</li>\n</' if frame[2] else '</') + ('ol' if frame[0]._ordered else 'ul') + '>\n'
+
+    def _render_html(self) -> str:
+        return ''.join(self._iter_html())
+
+    def _html_start(self):
+        return '<ol>\n' if self._ordered else '<ul>\n'
 
     def __getattr__(self, item, *args, **kwargs):
+        # Unset slots and private or special names are never delegated to the document, looking them up on it
+        # would recurse back into __getattr__
+        if item.startswith('_') or item in Formater.__slots__ or item in MDlist.__slots__:
+            raise AttributeError(item)
         if hasattr(self.parent_document, item):
             self.block_addition = True
 
@@ -431,174 +1407,277 @@ class MDlist(Formater):
                 return getattr(self.parent_document, item)(*arguments, **kw)
 
             return wrapper
+        raise AttributeError(item)
 
 
 class OrderedList(MDlist):
+    __slots__ = ()
+    _ordered = True
 
     def __init__(self):
         super().__init__()
 
 
 class UnorderedList(MDlist):
-    def __init__(self):
-        super().__init__()
-
+    __slots__ = ()
 
-class StringFormater(Formater):
-    def __init__(self, text_str: str):
+    def __init__(self):
         super().__init__()
-        self.text_str = text_str
 
-    def _validate(self, obj, func, funclist):
 
-        funclist.append(obj.__class__.__name__)
+class LazyUnorderedList(UnorderedList):
+    """
+    An unordered list whose first items are only produced while the document is rendered, items added with
+    add_item or sub lists follow them.
+    """
+    __slots__ = ('item_source',)
+    _parallel = False
+    _comparable = False
 
-        if self.get_class_by_func_name(func) in funclist:
-            raise FormatingException('Can only add weight once')
-
-        if obj.child is not None:
-            return self._validate(obj.child, func, funclist)
+    def __init__(self, items: Iterable[DocText | str] | Callable[[], Iterable[DocText | str]]):
+        super().__init__()
+        self.item_source = items
 
-        return True
+    def _iter_items(self):
+        doc_text = DocText().text if self.parent_document is None else self.parent_document._doc_text
+        produced = (doc_text(item) if isinstance(item, str) else item for item in _produce(self.item_source))
+        return itertools.chain(produced, self.items)
 
-    def _validate_func_exits_once(self, func):
-        top_node = self._find_top_parent()
-        self._validate(top_node, func, funclist=[])
+    def _render(self):
+        return self._render_markdown()
+
+    def _iter_render(self):
+        return self._iter_markdown()
+
+    def _iter_render_html(self):
+        return self._iter_html()
+
+
+WEIGHTS = {
+    'text': 0,
+    'nospace': 0,
+    'bold': 1,
+    'italic': 2,
+    'strikethrough': 4,
+    'important': 8,
+    'inlinecode': 16,
+}
+
+# (flag, formatsign, closesign, html start tag, html end tag) from the outermost to the innermost weight
+_NESTING = [
+    (WEIGHTS['bold'], '**', '**', '<strong>', '</strong>'),
+    (WEIGHTS['italic'], '*', '*', '<em>', '</em>'),
+    (WEIGHTS['strikethrough'], '~~', '~~', '<del>', '</del>'),
+    (WEIGHTS['important'], '==', '==', '<mark>', '</mark>'),
+    (WEIGHTS['inlinecode'], '`', '`', '<code>', '</code>'),
+]
+
+_AFFIXES = {}
+_HTML_AFFIXES = {}
+
+
+def _affixes(weights: int, html: bool = False) -> tuple[str, str]:
+    """
+    :return: The markup in front of and after a text with the given weights
+    """
+    affixes = _HTML_AFFIXES if html else _AFFIXES
+    try:
+        return affixes[weights]
+    except KeyError:
+        start, end = (3, 4) if html else (1, 2)
+        prefix = ''.join([weight[start] for weight in _NESTING if weights & weight[0]])
+        suffix = ''.join([weight[end] for weight in reversed(_NESTING) if weights & weight[0]])
+        affixes[weights] = (prefix, suffix)
+        return affixes[weights]
+
+
+for _weights in range(WEIGHTS['inlinecode'] << 1):
+    _affixes(_weights)
+    _affixes(_weights, html=True)
+
+
+def _weight_flag(name: str) -> int:
+    try:
+        return WEIGHTS[name]
+    except KeyError:
+        raise FormatingException(f"There is no weight named {name}")
+
+
+def register_weight(name: str, formatsign: str, closesign: str = None, html_tag: str = None) -> int:
+    """
+    Registers a custom weight that can then be added with weight(name), for example
+    register_weight('highlight', '==', html_tag='mark') or register_weight('sub', '<sub>', '</sub>').
+    Custom weights are nested inside the built-in weights, except inline code which is always innermost.
+    :param formatsign: The markup in front of the text
+    :param closesign: The markup after the text, defaults to the formatsign reversed
+    :param html_tag: The tag to use when rendering HTML, without it the markup is used as is
+    :return: The flag of the weight
+    """
+    if name in WEIGHTS:
+        raise FormatingException(f"There is already a weight named {name}")
+    flag = max(WEIGHTS.values()) << 1
+    closesign = formatsign[::-1] if closesign is None else closesign
+    html_start, html_end = (f'<{html_tag}>', f'</{html_tag}>') if html_tag is not None else (formatsign, closesign)
+    WEIGHTS[name] = flag
+    _NESTING.insert(len(_NESTING) - 1, (flag, formatsign, closesign, html_start, html_end))
+    return flag
+
+
+class StringFormater:
+    """
+    A span of text and its weights, stored as a bitmask of the flags in WEIGHTS.
+    """
+    __slots__ = ('text_str', 'weights', '_separator', '_owner')
+
+    def __init__(self, text_str: str, weights: int = 0):
+        self.text_str = text_str
+        self.weights = weights
+        # What is written in front of the span in a DocText, resolved from the nospaces when the span is appended.
+        # None for a nospace() marker, which is not rendered
+        self._separator = ' '
+        # The DocText the span is appended to, whose cache is dropped when the span is changed
+        self._owner = None
 
     def update_text_str(self,new_str):
-        self.text = new_str
-        if self.parent is not None:
-            self.parent.update_text_str(new_str)
-
-    @staticmethod
-    def get_class_by_func_name(func_name):
-        if func_name == 'text':
-            class_name = 'Text'
-        elif func_name == 'nospace':
-            class_name = 'NoSpace'
-        else:
-            first_letter = func_name[0].upper()
-            class_name = first_letter + func_name[1:] + 'Text'
-        return class_name
-
-    def init_class_by_name(self, func, text_str=None):
-
-        self._validate_func_exits_once(func)
+        self.text_str = new_str
+        self._invalidate()
 
-        if text_str is None:
-            text_str = self.text_str
-
-        module = __import__(self.__module__)
-        class_name = self.get_class_by_func_name(func)
-        cls = getattr(module, class_name)(text_str)
-        child = self._find_last_child()
-        child.child = cls
-        child.child.parent = self
+    def weight(self, name):
+        flag = _weight_flag(name)
+        if self.weights & flag:
+            raise FormatingException('Can only add weight once')
+        self.weights |= flag
+        self._invalidate()
+        return self
 
-        return self.child
+    def _invalidate(self):
+        if self._owner is not None:
+            self._owner._invalidate()
 
     def strikethrough(self):
-        return self.init_class_by_name('strikethrough')
+        return self.weight('strikethrough')
 
     def italic(self):
-        return self.init_class_by_name('italic')
+        return self.weight('italic')
 
     def inlinecode(self):
-        return self.init_class_by_name('inlinecode')
+        return self.weight('inlinecode')
 
     def bold(self):
-        return self.init_class_by_name('bold')
+        return self.weight('bold')
 
     def important(self):
-        return self.init_class_by_name('important')
+        return self.weight('important')
 
     def to_text(self):
-            if type(self) == NoSpace:
-                new_obj = NoSpace(self.text_str)
-            else:
-                new_obj = Text(self.text_str)
-            if self.child is not None:
-                if type(self.child) is not Text or type(self.child) is not NoSpace :
-                    self.child = new_obj
-                    return self.child.to_text()
-            else:
-                return new_obj
-            self.parent=None
-            return self
-
+        text = NoSpace(self.text_str) if type(self) == NoSpace else Text(self.text_str)
+        text._separator = self._separator
+        text._owner = self._owner
+        return text
 
     def __str__(self):
         return self.text_str
 
 
 class TextFormater(StringFormater):
+    __slots__ = ()
 
-    def __init__(self, text_str, formatsign):
-        super().__init__(text_str)
-        self.text = text_str
-        self.formatsign = formatsign
-
-    def _render(self):
-        master_parent = self._find_top_parent(self)
-        return self._render_top_parent_and_child(master_parent)
-
-    def _render_top_parent_and_child(self, obj, acc_str: str = ''):
-        acc_str = acc_str + obj.formatsign
-        if obj.child is not None:
-            return self._render_top_parent_and_child(obj.child, acc_str)
-        return_str = acc_str + obj.__str__() + acc_str[::-1]
-        return return_str
-
-    def __str__(self):
-        return self.text
+    def _render(self, escape: dict = _TEXT_ESCAPE, code_escape: dict = _CODE_SPAN_ESCAPE):
+        """
+        :param escape: Translation table escaping the text
+        :param code_escape: Translation table escaping inline code
+        """
+        prefix, suffix = _affixes(self.weights)
+        if self.weights & WEIGHTS['inlinecode']:
+            text = _escape(self.text_str, code_escape)
+            if '`' in text:
+                # Inline code is the innermost weight, widen its backticks beyond the longest run in the text
+                fence = '`' * max(map(len, re.findall('`+', text)))
+                prefix = prefix + fence + ' '
+                suffix = ' ' + fence + suffix
+            return prefix + text + suffix
+        return prefix + _escape(self.text_str, escape) + suffix
+
+    def _render_raw(self):
+        prefix, suffix = _affixes(self.weights)
+        return prefix + self.text_str + suffix
+
+    def _render_html(self):
+        prefix, suffix = _affixes(self.weights, html=True)
+        return prefix + html.escape(self.text_str, quote=False) + suffix
 
 
 class NoSpace(TextFormater):
+    __slots__ = ()
+
     def __init__(self, text_str: str = None):
-        super().__init__(text_str, formatsign='')
+        super().__init__(text_str)
+        self._separator = None if text_str is None else ''
 
     def __getattr__(self, item):
         if item in list(filter(lambda func: '__' not in func, dir(Document))):
             raise FormatingException(f"Cannot add {item} to nospace!")
+        raise AttributeError(item)
+
+
+class Text(TextFormater):
+    __slots__ = ()
+
+    def __init__(self, text_str: str, weights: int = 0):
+        super().__init__(text_str, weights)
 
 
 class StrikethroughText(TextFormater):
+    __slots__ = ()
+
     def __init__(self, text_str):
-        super().__init__(text_str=text_str, formatsign='~~')
+        super().__init__(text_str, WEIGHTS['strikethrough'])
 
 
 class ItalicText(TextFormater):
-    def __init__(self, text_str):
-        super().__init__(text_str, formatsign='*')
+    __slots__ = ()
 
-
-class Text(TextFormater):
-    def __init__(self, text_str: str):
-        super().__init__(text_str, formatsign='')
+    def __init__(self, text_str):
+        super().__init__(text_str, WEIGHTS['italic'])
 
 
 class BoldText(TextFormater):
+    __slots__ = ()
+
     def __init__(self, text_str):
-        super().__init__(text_str, formatsign='**')
+        super().__init__(text_str, WEIGHTS['bold'])
 
 
 class InlinecodeText(TextFormater):
+    __slots__ = ()
+
     def __init__(self, text_str):
-        super().__init__(text_str, formatsign='`')
+        super().__init__(text_str, WEIGHTS['inlinecode'])
+
 
 class ImportantText(TextFormater):
+    __slots__ = ()
+
     def __init__(self,text_str):
-        super().__init__(text_str, formatsign='==')
+        super().__init__(text_str, WEIGHTS['important'])
+
 
 class HorizaontalRule(Formater):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
     def _render(self):
         return '\n---\n'
 
+    def _render_html(self):
+        return '<hr>\n'
+
 
 class Break(Formater):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -606,8 +1685,12 @@ class Break(Formater):
     def render():
         return '<br/>'
 
+    def _render_html(self):
+        return '<br>\n'
+
 
 class Heading(Formater):
+    __slots__ = ('size', 'text')
 
     def __init__(self, text, size=1):
         super().__init__()
@@ -615,97 +1698,962 @@ class Heading(Formater):
         self.text = text
 
     def _render(self):
-        return '\n' + ''.join(['#' for _ in range(0, self.size)]) + f' {self.text}\n'
+        text = self._text_escape(str(self.text), _LINE_ESCAPE)
+        return '\n' + '#' * self.size + f' {text}\n'
 
+    def _render_html(self):
+        return f'<h{self.size}>' + html.escape(str(self.text), quote=False) + f'</h{self.size}>\n'
+
+
+class TableFormater(Formater):
+    """
+    The headers and cell handling shared by Table and StreamingTable.
+    """
+    __slots__ = ('headers',)
 
-class Table(Formater):
     def __init__(self, headers: Iterable):
         super().__init__()
-        self.headers = self._entry_to_doc_text(headers)
-        self.rows = []
+        self.headers = [self._entry_to_cell(header) for header in headers]
 
+    def _entry_to_cell(self, entry):
+        """
+        Plain values are stored as strings, only DocText entries are kept as objects.
+        """
+        if isinstance(entry, DocText):
+            entry.parent_feature = Table
+            return self._own(entry)
+        return str(entry)
 
-    def _entry_to_doc_text(self, entries,parent_feature=None):
-        for i, entry in enumerate(entries):
+    @staticmethod
+    def _render_html_row(row, tag='td'):
+        cells = [entry._render_html() if isinstance(entry, DocText) else html.escape(str(entry), quote=False)
+                 for entry in row]
+        return f'<tr><{tag}>' + f'</{tag}><{tag}>'.join(cells) + f'</{tag}></tr>\n'
 
-            if type(entry) == str:
-                new_entry = DocText().nospace(entry)
-                new_entry.parent_feature = parent_feature
 
-            elif type(entry)==DocText:
-                new_entry = entry
-                new_entry.parent_feature=parent_feature
-            else:
-                new_entry = DocText().nospace(str(entry))
-                new_entry.parent_feature = parent_feature
-            entries[i] = new_entry
-        return entries
+class Table(TableFormater):
+    __slots__ = ('columns',)
+
+    def __init__(self, headers: Iterable):
+        super().__init__(headers)
+        self.columns = [[] for _ in self.headers]
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> Table:
+        """
+        Creates a table from a mapping of header to the values of that column.
+        :param columns: For example {"key": ["a", "b"], "value": [1, 2]}
+        """
+        table = cls(columns.keys())
+        values = [[table._entry_to_cell(entry) for entry in column] for column in columns.values()]
+        if len({len(column) for column in values}) > 1:
+            raise FormatingException("Cannot create table from columns of different length")
+        table.columns = values
+        return table
+
+    @property
+    def rows(self) -> list:
+        return [list(row) for row in zip(*self.columns)]
+
+    def cell(self, row: int, column: int) -> DocText:
+        """
+        Returns the DocText of a cell so that weights can be added to it, for example table.cell(0, 1).bold()
+        """
+        entry = self.columns[column][row]
+        if not isinstance(entry, DocText):
+            entry = self._entry_to_cell(DocText().nospace(entry))
+            self.columns[column][row] = entry
+            self._invalidate()
+        return entry
 
     def add_row(self,values:Iterable,index=None):
         if len(self.headers)!= len(values):
             raise FormatingException("Cannot add row with a size not matching size of headers")
         else:
-            rows = self._entry_to_doc_text(values,Table)
-            if index is not None:
-                self.rows.insert(index, rows)
-            else:
-                self.rows.append(rows)
+            for column, entry in zip(self.columns, values):
+                cell = entry if type(entry) is str else self._entry_to_cell(entry)
+                if index is not None:
+                    column.insert(index, cell)
+                else:
+                    column.append(cell)
+            self._invalidate()
 
         return self
 
-    def _join_row(self,acc_row,new_col,last_col=False):
-        acc_row = acc_row + '|%s' % new_col._render() if type(new_col) == DocText else new_col
-        if last_col:
-            acc_row = acc_row + '|\n'
-        return acc_row
+    def add_rows(self, rows: Iterable[Iterable]):
+        """
+        Adds many rows at once, for example the rows of a query result.
+        """
+        size = len(self.headers)
+        for values in rows:
+            if len(values) != size:
+                raise FormatingException("Cannot add row with a size not matching size of headers")
+            for column, entry in zip(self.columns, values):
+                column.append(entry if type(entry) is str else self._entry_to_cell(entry))
+        self._invalidate()
+        return self
+
+    @staticmethod
+    def _join_row(row, widths):
+        return '|' + '|'.join([column.ljust(width) for column, width in zip(row, widths)]) + '|\n'
+
+    @staticmethod
+    def _render_column(header, column):
+        rendered_column = [_escape(header, _LINE_ESCAPE) if type(header) is str else header._render()]
+        rendered_column.extend([_escape(entry, _LINE_ESCAPE) if type(entry) is str else entry._render()
+                                for entry in column])
+        return rendered_column
+
+    def _render_markdown(self):
+        rendered_columns = [self._render_column(header, column) for header, column in zip(self.headers, self.columns)]
+        widths = [max(map(len, column)) for column in rendered_columns]
+        rendered_rows = zip(*rendered_columns)
+
+        text_rows = [self._join_row(row, widths) for row in rendered_rows]
+        text_rows.insert(1, self._join_row(['-' * width for width in widths], widths))
+        return '\n\n' + ''.join(text_rows) + '\n'
+
+    def _iter_render_html(self):
+        yield '<table>\n<thead>\n' + self._render_html_row(self.headers, 'th') + '</thead>\n<tbody>\n'
+        for row in zip(*self.columns):
+            yield self._render_html_row(row)
+        yield '</tbody>\n</table>\n'
+
+    def _render_html(self):
+        return ''.join(self._iter_render_html())
+
+
+class StreamingTable(TableFormater):
+    __slots__ = ('row_source', 'widths')
+    _parallel = False
+    _comparable = False
+
+    def __init__(self, headers: Iterable, rows: Iterable[Iterable] | Callable[[], Iterable[Iterable]],
+                 width: int | Iterable[int] = None):
+        super().__init__(headers)
+        self.row_source = rows
+        if width is None or isinstance(width, int):
+            self.widths = None if width is None else [width for _ in self.headers]
+        else:
+            self.widths = list(width)
+            if len(self.widths) != len(self.headers):
+                raise FormatingException("Cannot use column widths not matching size of headers")
 
-    def _get_second_rows_count(self,rows):
+    @staticmethod
+    def _render_cell(entry):
+        if isinstance(entry, DocText):
+            # The rows are produced while rendering, their texts are rendered as cells without being kept
+            return entry._render() if entry.parent_feature == Table else entry._render_markdown(feature=Table)
+        return _escape(str(entry), _LINE_ESCAPE)
+
+    def _join_row(self, row):
+        if self.widths is None:
+            return '|' + '|'.join(row) + '|\n'
+        return Table._join_row(row, self.widths)
+
+    def _iter_render(self):
+        rows = self.row_source() if callable(self.row_source) else self.row_source
+        headers = [self._render_cell(header) for header in self.headers]
+        if self.widths is None:
+            dashes = ['-' * max(3, len(header)) for header in headers]
+        else:
+            dashes = ['-' * width for width in self.widths]
 
-        longest_word_count = [0 for _ in range(0, len(self.headers))]
-        wordcounts = []
-        for row in rows:
-            for word in row:
-                rendered_content = word._render()
-                wordcounts.append(len(rendered_content))
+        yield '\n\n' + self._join_row(headers) + self._join_row(dashes)
+        size = len(headers)
+        for values in rows:
+            if len(values) != size:
+                raise FormatingException("Cannot add row with a size not matching size of headers")
+            yield self._join_row([self._render_cell(entry) for entry in values])
+        yield '\n'
 
+    def _render(self):
+        return ''.join(self._iter_render())
+
+    def _iter_render_html(self):
+        rows = self.row_source() if callable(self.row_source) else self.row_source
+        yield '<table>\n<thead>\n' + self._render_html_row(self.headers, 'th') + '</thead>\n<tbody>\n'
+        size = len(self.headers)
+        for values in rows:
+            if len(values) != size:
+                raise FormatingException("Cannot add row with a size not matching size of headers")
+            yield self._render_html_row(values)
+        yield '</tbody>\n</table>\n'
+
+    def _render_html(self):
+        return ''.join(self._iter_render_html())
+
+
+class Slot(str):
+    """
+    A placeholder for a value that is filled in when a compiled Template is rendered. It can be used wherever the
+    document takes a string, for example Document().text("Total:").bold(Slot('total')). In markdown the cells of a
+    table are padded to the width of the placeholder, not of the value.
+    """
+
+    def __new__(cls, name: str):
+        # The name is hex encoded between control characters that no escaping or wrapping touches
+        slot = super().__new__(cls, f'\x02{name.encode().hex()}\x03')
+        slot.name = name
+        return slot
+
+    def __getnewargs__(self):
+        # Unpickling creates the slot from its name, not from the encoded string
+        return (self.name,)
+
+
+_SLOT = re.compile('\x02([tlkK]?)([0-9a-f]*)\x03')
+
+
+class Template:
+    """
+    A rendered document split into its static fragments and the slots between them, made with Document.compile.
+    Rendering it only formats the slot values and joins the pieces.
+    """
+    __slots__ = ('pieces', 'slots', 'html')
+
+    def __init__(self, rendered: str, html=False):
+        self.pieces = _SLOT.split(rendered)
+        # Every slot is split into the mark of its context and its hex encoded name, the name is replaced by the
+        # value when rendering
+        self.slots = []
+        for index in range(1, len(self.pieces), 3):
+            self.slots.append((index + 1, bytes.fromhex(self.pieces[index + 1]).decode(), self.pieces[index]))
+            self.pieces[index] = ''
+        self.html = html
+
+    def _format(self, value, context: str):
+        """
+        :param context: The mark of the slot, 't' in running text, 'l' in a table cell or heading, 'k' in inline
+            code, 'K' in inline code in a table cell and '' in a fenced code block
+        """
+        if self.html:
+            return value._render_html() if isinstance(value, DocText) else html.escape(str(value), quote=False)
+        if isinstance(value, DocText):
+            if context == 't':
+                return value._render(leading_nospace=True)
+            if context == 'l':
+                return value._render_markdown(leading_nospace=True, feature=Table)
+            raise FormatingException("Cannot write a DocText in a slot of code")
+        text = str(value)
+        if context == '':
+            if '```' in text:
+                raise FormatingException("Cannot write ``` in a slot of a code block")
+            return text
+        if context in 'kK':
+            if '`' in text:
+                raise FormatingException("Cannot write ` in a slot of inline code")
+            return text.translate(_CODE_SPAN_ESCAPE if context == 'k' else _TABLE_CODE_SPAN_ESCAPE)
+        return text.translate(_LINE_ESCAPE)
+
+    def render(self, values: dict = None, **kwargs) -> str:
+        """
+        :param values: The value of each slot by name, a DocText or a value that is escaped as plain text, inline
+            code or code the way the text at the slot was escaped. A DocText is rendered as running text or as a
+            table cell, it cannot fill a slot in code
+        """
+        values = kwargs if values is None else {**values, **kwargs}
+        pieces = self.pieces.copy()
+        for index, name, context in self.slots:
+            try:
+                pieces[index] = self._format(values[name], context)
+            except KeyError:
+                raise FormatingException(f"There is no value for the slot {name}")
+        return ''.join(pieces)
+
+    def render_to(self, fp, values: dict = None, **kwargs):
+        fp.write(self.render(values, **kwargs))
+
+
+class RenderStats:
+    """
+    Timings recorded while a document is rendered or stored, enabled by giving the document a RenderStats, for
+    example Document(stats=RenderStats()). The same object can collect the timings of many documents.
+    The time of a block is the time spent producing its output, not writing it. Time spent writing to the files of
+    store_document is recorded on its own, as is the time spent indenting HTML with BeautifulSoup and rendering
+    blocks in worker processes with render_document_text(workers).
+    """
+    __slots__ = ('blocks', 'pretty_seconds', 'io_seconds', 'io_characters', 'parallel_seconds', 'parallel_blocks')
 
-        for wordcount in wordcounts:
-            for index, value in enumerate(longest_word_count):
-                if wordcount > value:
-                    longest_word_count[index] = wordcount
-        return longest_word_count
+    def __init__(self):
+        # The count, seconds and characters of the rendered blocks by output format and block type
+        self.blocks = {}
+        self.pretty_seconds = 0.0
+        self.io_seconds = 0.0
+        self.io_characters = 0
+        self.parallel_seconds = 0.0
+        self.parallel_blocks = 0
+
+    def _block(self, output: str, md) -> list:
+        key = (output, type(md).__name__)
+        block = self.blocks.get(key)
+        if block is None:
+            block = self.blocks[key] = [0, 0.0, 0]
+        block[0] += 1
+        return block
+
+    def _measure(self, output: str, md, chunks: Iterable[str]):
+        block = self._block(output, md)
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            block[1] += time.perf_counter() - start
+            if chunk is None:
+                return
+            block[2] += len(chunk)
+            yield chunk
+
+    def _measure_write(self, md: RawCodeBlock, fp):
+        # The block writes itself, what it wrote to a measured file is taken out of its time and is its characters
+        block = self._block('markdown', md)
+        io_seconds, io_characters = self.io_seconds, self.io_characters
+        start = time.perf_counter()
+        md._write_to(fp)
+        block[1] += time.perf_counter() - start - (self.io_seconds - io_seconds)
+        block[2] += self.io_characters - io_characters
+
+    def as_dict(self) -> dict:
+        """
+        :return: The timings as plain values, for example to send them to a metrics system
+        """
+        blocks = {}
+        for (output, name), (count, seconds, characters) in self.blocks.items():
+            blocks.setdefault(output, {})[name] = {'count': count, 'seconds': seconds, 'characters': characters}
+        return {
+            'blocks': blocks,
+            'pretty_seconds': self.pretty_seconds,
+            'io': {'seconds': self.io_seconds, 'characters': self.io_characters},
+            'parallel': {'seconds': self.parallel_seconds, 'blocks': self.parallel_blocks},
+        }
+
+
+class _MeasuredFile:
+    """
+    A file whose writes are timed into RenderStats, anything else is passed on to the file. Writes to its binary
+    buffer are timed as well, counting bytes as characters.
+    """
+    __slots__ = ('file', 'stats')
+
+    def __init__(self, file, stats: RenderStats):
+        self.file = file
+        self.stats = stats
+
+    @property
+    def buffer(self) -> _MeasuredFile:
+        return _MeasuredFile(self.file.buffer, self.stats)
+
+    def write(self, text: str | bytes):
+        start = time.perf_counter()
+        written = self.file.write(text)
+        self.stats.io_seconds += time.perf_counter() - start
+        self.stats.io_characters += len(text) if isinstance(text, str) else memoryview(text).nbytes
+        return written
 
-    def _create_second_row(self,largest_columns):
+    def __getattr__(self, item):
+        return getattr(self.file, item)
 
-        column_list = []
-        for col in largest_columns:
-            dashes_string = ''
-            dashes = ['-' for _ in range(0,col)]
-            dashes_string=dashes_string.join(dashes)
-            column_list.append(DocText().nospace(dashes_string))
-        return column_list
+    def __enter__(self):
+        self.file.__enter__()
+        return self
 
-    def _add_space_amount(self, col_max, word):
+    def __exit__(self, *exc_info):
+        return self.file.__exit__(*exc_info)
+
+
+class _Flushed(NamedTuple):
+    """
+    What an incremental store_document has written, the number of blocks, the position in the file in front of the
+    last block, the text written for it and the position where the blocks end.
+    """
+    path: str
+    html: bool
+    blocks: int
+    list_last: bool
+    tail_offset: int
+    tail: str | None
+    end: int
+
+
+class RenderResult(NamedTuple):
+    document: Document
+    path: str | None
+    error: Exception | None
+
+
+def _store_document(document: Document, html: bool, pretty: bool):
+    document.store_document(html=html, pretty=pretty)
+
+
+def render_many(documents: Iterable[Document], workers: int = None, html: bool = False,
+                pretty: bool = False) -> list[RenderResult]:
+    """
+    Renders and stores many documents in a pool of processes. The documents are pickled to reach the workers,
+    so their content cannot contain generators or lambdas, and weights added with register_weight must be
+    registered in the workers as well, for example by registering them when the module defining them is imported.
+    :param workers: Number of processes, defaults to the number of processors
+    :return: One result per document in the same order, with the error raised while storing it if any
+    """
+    documents = list(documents)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_store_document, document, html, pretty) for document in documents]
+        for document, future in zip(documents, futures):
+            try:
+                future.result()
+                error = None
+            except Exception as e:
+                error = e
+            path = document._file_and_path() if document.file_name is not None else None
+            results.append(RenderResult(document, path, error))
+    return results
+
+
+class _BlockPickler(pickle.Pickler):
+    """
+    Pickles blocks without the document they belong to, a worker only needs the blocks to render them.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Document):
+            return 'document'
+        return None
+
+
+class _BlockUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid):
+        return None
+
+
+def _dumps_blocks(blocks: list) -> bytes:
+    buffer = io.BytesIO()
+    _BlockPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(blocks)
+    return buffer.getvalue()
+
+
+def _render_blocks(data: bytes) -> list[str]:
+    blocks = _BlockUnpickler(io.BytesIO(data)).load()
+    return [md._render(leading_nospace=True) if leading_nospace else ''.join(md._iter_render())
+            for md, leading_nospace in blocks]
+
+
+SERIAL_MAGIC = b'MDOC'
+SERIAL_VERSION = 1
+# Magic, then the format version and the length of the JSON header
+_SERIAL_PREAMBLE = struct.Struct('<4sHI')
+
+
+def _encode_text(doc_text: DocText) -> list:
+    spans = [[span.text_str, span.weights, 0] if isinstance(span, NoSpace) else [span.text_str, span.weights]
+             for span in doc_text.md_objects]
+    wrap = None if doc_text.wrap is None else [doc_text.wrap.words, doc_text.wrap.width]
+    return [spans, wrap, int(doc_text.dont_add_more_weights)]
+
+
+def _encode_list(md_list: MDlist) -> list:
+    # The tree is flattened into items, 'u' or 'o' opening a sub list and 0 closing it, so that neither encoding
+    # nor decoding a deep tree recurses
+    events = []
+    stack = [iter(md_list.items)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, MDlist):
+                events.append('o' if item._ordered else 'u')
+                stack.append(iter(item.items))
+                break
+            events.append(_encode_text(item))
+        else:
+            stack.pop()
+            if stack:
+                events.append(0)
+    return events
+
+
+def _encode_cell(entry):
+    return entry if type(entry) is str else _encode_text(entry)
+
+
+def _encode_block(md) -> list:
+    tag = _SERIAL_TAGS.get(type(md))
+    if tag is None or (tag == 'R' and not isinstance(md.payload, (str, os.PathLike))):
+        raise FormatingException(f"Cannot serialize a {type(md).__name__}, its content is only read while rendering")
+    if tag == 't':
+        return [tag, _encode_text(md)]
+    if tag in 'qc':
+        return [tag, _encode_text(md.text)]
+    if tag == 'x':
+        return [tag, _encode_text(md.text_str), md.checked]
+    if tag == 'h':
+        return [tag, str(md.text), md.size]
+    if tag == 'T':
+        return [tag, [_encode_cell(header) for header in md.headers],
+                [[_encode_cell(entry) for entry in column] for column in md.columns]]
+    if tag in 'uo':
+        return [tag, _encode_list(md)]
+    if tag == 'R':
+        return [tag, os.fspath(md.payload), md.encoding]
+    return [tag]
+
+
+def _json_bytes(obj) -> bytes:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def dumps(document: Document) -> bytes:
+    """
+    Serializes a document into a compact, versioned format that loads or SerializedDocument reads back. Each block
+    is encoded on its own and indexed, so that single blocks can be loaded without the rest. Blocks whose content
+    is only produced while rendering cannot be serialized.
+    """
+    blocks = [_json_bytes(_encode_block(md)) for md in document.md_objects]
+    header = _json_bytes({
+        'file_name': document.file_name,
+        'file_path': document.file_path,
+        'wrap': None if document.wrap is None else [document.wrap.words, document.wrap.width],
+        'weights': WEIGHTS,
+        'kinds': ''.join([_SERIAL_TAGS[type(md)] for md in document.md_objects]),
+    })
+    offsets = list(itertools.accumulate(map(len, blocks), initial=0))
+    return b''.join([_SERIAL_PREAMBLE.pack(SERIAL_MAGIC, SERIAL_VERSION, len(header)), header,
+                     struct.pack(f'<{len(offsets)}Q', *offsets), *blocks])
+
+
+def loads(data: bytes) -> Document:
+    return SerializedDocument(data).document()
+
+
+class SerializedDocument:
+    """
+    A document serialized with dumps, whose blocks are only decoded when they are asked for.
+    """
+    __slots__ = ('data', 'header', 'offsets', 'kinds', '_blocks_start', '_weight_map')
+
+    def __init__(self, data: bytes | memoryview):
+        self.data = memoryview(data)
+        if len(self.data) < _SERIAL_PREAMBLE.size:
+            raise FormatingException("Not a serialized document")
+        magic, version, header_size = _SERIAL_PREAMBLE.unpack_from(self.data)
+        if magic != SERIAL_MAGIC:
+            raise FormatingException("Not a serialized document")
+        if version != SERIAL_VERSION:
+            raise FormatingException(f"Cannot read version {version} of the serialized document format")
+        start = _SERIAL_PREAMBLE.size
+        self.header = json.loads(bytes(self.data[start:start + header_size]))
+        self.kinds = self.header['kinds']
+        start = start + header_size
+        self.offsets = struct.unpack_from(f'<{len(self.kinds) + 1}Q', self.data, start)
+        self._blocks_start = start + 8 * (len(self.kinds) + 1)
+        self._weight_map = self._map_weights(self.header['weights'])
 
-        space_amount = col_max-len(word._render())
-        word.render_spaces=space_amount
-        return word
+    @staticmethod
+    def _map_weights(weights: dict):
+        """
+        :return: The flags of this process for each flag of the serialized weights, None if they are the same
+        """
+        if all(WEIGHTS.get(name) == flag for name, flag in weights.items()):
+            return None
+        return [(flag, _weight_flag(name)) for name, flag in weights.items() if flag]
+
+    def _weights(self, weights: int) -> int:
+        if self._weight_map is None:
+            return weights
+        return functools.reduce(operator.or_, [local for flag, local in self._weight_map if weights & flag], 0)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _decode_text(self, encoded: list) -> DocText:
+        spans, wrap, dont_add_more_weights = encoded
+        doc_text = DocText(wrap=None if wrap is None else LineWrap(*wrap))
+        for span in spans:
+            formater = NoSpace(span[0]) if len(span) > 2 else Text(span[0])
+            formater.weights = self._weights(span[1])
+            doc_text._append(formater)
+        doc_text.dont_add_more_weights = bool(dont_add_more_weights)
+        return doc_text
+
+    def _decode_list(self, md_list: MDlist, events: list) -> MDlist:
+        current = md_list
+        for event in events:
+            if event == 0:
+                current = current.parent
+            elif event == 'u':
+                current = current._add_list(UnorderedList())
+            elif event == 'o':
+                current = current._add_list(OrderedList())
+            else:
+                current.items.append(current._own(self._decode_text(event)))
+        return md_list
 
-    def _render(self):
-        self.add_row(self.headers, 0)
-        wordcounts = self._get_second_rows_count(self.rows)
-        second_row = self._create_second_row(wordcounts)
-        self.add_row(second_row,1)
+    def _decode_cell(self, entry):
+        return entry if type(entry) is str else self._decode_text(entry)
 
-        text_rows = ''
-        for row in self.rows:
-            for col_index, column in enumerate(row):
-                self._add_space_amount(wordcounts[col_index],column)
-                text_rows = self._join_row(text_rows,column,True if col_index==len(row)-1 else False)
+    def block(self, index: int, document: Document = None):
+        """
+        Decodes a single block.
+        :param document: The document the block is added to, lists and tables return to it with get_parent
+        """
+        start = self._blocks_start
+        encoded = json.loads(bytes(self.data[start + self.offsets[index]:start + self.offsets[index + 1]]))
+        tag = encoded[0]
+        if tag == 't':
+            return self._decode_text(encoded[1])
+        if tag == 'q':
+            return Quote(self._decode_text(encoded[1]))
+        if tag == 'c':
+            return FencedCodeBlock(self._decode_text(encoded[1]))
+        if tag == 'x':
+            return TextCheckbox(self._decode_text(encoded[1]), encoded[2])
+        if tag == 'h':
+            return Heading(encoded[1], encoded[2])
+        if tag == 'r':
+            return HorizaontalRule()
+        if tag == 'b':
+            return Break()
+        if tag == 'R':
+            return RawCodeBlock(encoded[1], encoded[2])
+        if tag == 'T':
+            table = Table([self._decode_cell(header) for header in encoded[1]])
+            table.columns = [[cell if type(cell) is str else table._entry_to_cell(self._decode_text(cell))
+                              for cell in column] for column in encoded[2]]
+            table.parent_document = document
+            return table
+        if tag in 'uo':
+            md_list = UnorderedList() if tag == 'u' else OrderedList()
+            md_list.parent_document = document
+            return self._decode_list(md_list, encoded[1])
+        raise FormatingException(f"Unknown block {tag} in serialized document")
+
+    def render_block(self, index: int) -> str:
+        """
+        Renders a single block with the separator in front of it, as it is rendered in the whole document.
+        Only this block is decoded.
+        """
+        md = self.block(index)
+        separator = ''
+        if index > 0:
+            separator = Document._separator_of(_SERIAL_CLASSES[self.kinds[index - 1]], type(md),
+                                               _SERIAL_CLASSES[self.kinds[-1]])
+        if index > 0 and self.kinds[index - 1] == 'x' and isinstance(md, DocText):
+            return separator + md._render(leading_nospace=True)
+        return separator + ''.join(md._iter_render())
+
+    def document(self) -> Document:
+        header = self.header
+        wrap = header['wrap']
+        document = Document(header['file_name'], header['file_path'], None if wrap is None else LineWrap(*wrap))
+        document.md_objects = [self.block(index, document) for index in range(len(self))]
+        return document
 
-        return '\n\n'+text_rows+'\n'
 
+_SERIAL_TAGS = {
+    DocText: 't',
+    Quote: 'q',
+    FencedCodeBlock: 'c',
+    TextCheckbox: 'x',
+    Heading: 'h',
+    HorizaontalRule: 'r',
+    Break: 'b',
+    Table: 'T',
+    UnorderedList: 'u',
+    OrderedList: 'o',
+    RawCodeBlock: 'R',
+}
+_SERIAL_CLASSES = {tag: cls for cls, tag in _SERIAL_TAGS.items()}
+
+
+_FENCE_LINE = re.compile(r' {0,3}(`{3,}|~{3,})')
+_HEADING_LINE = re.compile(r' {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t]*$')
+_RULE_LINE = re.compile(r' {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_CHECKBOX_LINE = re.compile(r'[ \t]{0,3}[-*+] \[([ xX])\](?: (.*))?$')
+_LIST_LINE = re.compile(r'([ \t]*)(?:([-*+])|\d{1,9}[.)])(?=[ \t]|$)(.*)$')
+# An item written by markitdown without a space after the marker, when the item starts with a nospace
+_GLUED_LIST_LINE = re.compile(r'([ \t]*)(?:(-)|\d{1,9}[.)])(\S.*)$')
+_QUOTE_LINE = re.compile(r' {0,3}> ?(.*)$')
+_TABLE_CELL_SEPARATOR = re.compile(r'(?<!\\)\|')
+_TABLE_DELIMITER_LINE = re.compile(r'[ \t]*\|?(?:[ \t]*:?-+:?[ \t]*\|)+[ \t]*:?-*:?[ \t]*$')
+_BACKSLASH_ESCAPE = re.compile(r'\\([!-/:-@\[-`{-~])')
+
+
+def _unescape(text: str) -> str:
+    return html.unescape(_BACKSLASH_ESCAPE.sub(r'\1', text)) if '&' in text or '\\' in text else text
+
+
+class _MarkdownReader:
+    """
+    Parses markdown line by line into a document. Text that can continue on the next line, paragraphs, quotes,
+    checkboxes and list items, is collected until a line starting another block or an empty line.
+    """
+
+    def __init__(self, document: Document):
+        self.document = document
+        # The block the collected lines belong to, 'paragraph', 'quote', 'checkbox' or 'item', and the lines
+        self.pending = None
+        self.lines = []
+        self.checked = False
+        # (indentation, list) of the list items are added to, from the outermost list
+        self.lists = []
+        self.table = None
+        self.fence = None
+        self.code = []
+        # Weight markup from the longest sign, since a sign can start with a shorter one, like ** and *
+        self.signs = sorted([(formatsign, closesign, flag) for flag, formatsign, closesign, _, _ in _NESTING
+                             if flag != WEIGHTS['inlinecode']], key=lambda sign: -len(sign[0]))
+        specials = {'`', '\\', '&', '<'} | {formatsign[0] for formatsign, _, _ in self.signs} | \
+                   {closesign[0] for _, closesign, _ in self.signs}
+        self.special = re.compile('[' + re.escape(''.join(sorted(specials))) + ']')
+
+    def read(self, lines: Iterable[str]):
+        for line in lines:
+            self.read_line(line.rstrip('\r\n'))
+        self.flush()
+        if self.fence is not None:
+            self.document.fenced_code_block('\n'.join(self.code))
+
+    def read_line(self, line: str):
+        if self.fence is not None:
+            if line.strip() and line.strip().strip(self.fence[0]) == '' and len(line.strip()) >= len(self.fence):
+                self.document.fenced_code_block('\n'.join(self.code))
+                self.fence = None
+                self.code = []
+            else:
+                self.code.append(line)
+            return
+        if not line.strip():
+            self.flush()
+            self.lists = []
+            self.table = None
+            return
+        if self.table is not None and line.lstrip().startswith('|'):
+            self.add_row(line)
+            return
+        fence = _FENCE_LINE.match(line)
+        if fence:
+            self.flush()
+            self.fence = fence.group(1)
+            return
+        heading = _HEADING_LINE.match(line)
+        if heading:
+            self.flush()
+            self.document.heading(_unescape(heading.group(2) or ''), len(heading.group(1)))
+            return
+        if _RULE_LINE.match(line):
+            self.flush()
+            self.document.horizontal_rule()
+            return
+        checkbox = _CHECKBOX_LINE.match(line)
+        if checkbox:
+            if self.lines and self.lines[-1].endswith(' '):
+                # The space markitdown writes in front of the line break of a checkbox
+                self.lines[-1] = self.lines[-1][:-1]
+            self.flush()
+            self.pending = 'checkbox'
+            self.checked = checkbox.group(1) != ' '
+            self.lines.append(checkbox.group(2) or '')
+            return
+        item = _LIST_LINE.match(line)
+        if item is None and self.pending == 'item':
+            item = _GLUED_LIST_LINE.match(line)
+        if item:
+            self.flush()
+            self.enter_list(len(item.group(1).expandtabs(4)), item.group(2) is None)
+            self.pending = 'item'
+            self.lines.append(item.group(3))
+            return
+        quote = _QUOTE_LINE.match(line)
+        if quote:
+            if self.pending != 'quote':
+                self.flush()
+                self.pending = 'quote'
+            self.lines.append(quote.group(1))
+            return
+        if line.lstrip().startswith('|'):
+            self.flush()
+            self.table = self.document.table([self.cell(cell) for cell in self.split_row(line)])
+            return
+        if self.pending is None:
+            self.pending = 'paragraph'
+        self.lines.append(line)
+
+    def flush(self):
+        if self.pending is None:
+            return
+        text = self.join_lines()
+        if self.pending == 'paragraph':
+            self.document.md_objects.append(self.text(text))
+        elif self.pending == 'quote':
+            self.document.quote(self.text(text))
+        elif self.pending == 'checkbox':
+            self.document.checkbox(self.text(text), self.checked)
+        else:
+            self.lists[-1][1].add_item(self.text(text))
+        self.pending = None
+        self.lines = []
+
+    def join_lines(self) -> str:
+        # A line wrapped by markitdown ends with the space in front of the line break
+        pieces = [self.lines[0]]
+        for line in itertools.islice(self.lines, 1, None):
+            pieces.append(line if pieces[-1].endswith(' ') else ' ' + line)
+        return ''.join(pieces)
+
+    def enter_list(self, indentation: int, ordered: bool):
+        while len(self.lists) > 1 and indentation < self.lists[-1][0]:
+            self.lists.pop()
+        if self.lists and indentation > self.lists[-1][0]:
+            parent = self.lists[-1][1]
+            self.lists.append((indentation, parent.ordered_list() if ordered else parent.unordered_list()))
+        elif not self.lists or (len(self.lists) == 1 and self.lists[0][1]._ordered != ordered):
+            md_list = self.document.ordered_list() if ordered else self.document.unordered_list()
+            self.lists = [(indentation, md_list)]
 
+    @staticmethod
+    def split_row(line: str) -> list[str]:
+        line = line.strip()
+        cells = _TABLE_CELL_SEPARATOR.split(line[1:-1] if line.endswith('|') and len(line) > 1 else line[1:])
+        return [cell.rstrip() for cell in cells]
+
+    def add_row(self, line: str):
+        if not self.table.columns[0] and _TABLE_DELIMITER_LINE.match(line):
+            return
+        cells = [self.cell(cell) for cell in self.split_row(line)]
+        size = len(self.table.headers)
+        self.table.add_row((cells + [''] * size)[:size])
+
+    def cell(self, text: str) -> DocText | str:
+        if self.special.search(text) is None:
+            return text.strip()
+        runs = self.runs(text)
+        if not runs or (len(runs) == 1 and runs[0][1] == 0):
+            return ''.join([run[0] for run in runs]).strip()
+        return self.text_from_runs(runs, DocText())
+
+    def text(self, text: str) -> DocText:
+        return self.text_from_runs(self.runs(text), DocText(wrap=self.document.wrap))
+
+    def runs(self, text: str) -> list[tuple[str, int]]:
+        """
+        :return: The text split into runs of text with the same weights, unescaped
+        """
+        runs = []
+        active = []
+        weights = 0
+        plain = []
+        position = 0
+        # Where the last sign opened or closed ends
+        boundary = 0
+        size = len(text)
+
+        def end_run():
+            if plain:
+                runs.append((_unescape(''.join(plain)), weights))
+                plain.clear()
+
+        while position < size:
+            special = self.special.search(text, position)
+            if special is None:
+                plain.append(text[position:])
+                break
+            start = special.start()
+            if start > position:
+                plain.append(text[position:start])
+                position = start
+            char = text[position]
+            if text.startswith(_CODE_SPAN_SEPARATOR, position):
+                position = position + len(_CODE_SPAN_SEPARATOR)
+                continue
+            if char == '\\' and position + 1 < size:
+                plain.append(text[position:position + 2])
+                position = position + 2
+                continue
+            if char == '`':
+                fence_end = position
+                while fence_end < size and text[fence_end] == '`':
+                    fence_end = fence_end + 1
+                fence = text[position:fence_end]
+                close = re.compile('(?<!`)' + fence + '(?!`)').search(text, fence_end)
+                if close is not None:
+                    end_run()
+                    code = text[fence_end:close.start()]
+                    if len(code) > 1 and code[0] == ' ' and code[-1] == ' ' and code.strip(' '):
+                        code = code[1:-1]
+                    runs.append((code.replace('\\|', '|'), weights | WEIGHTS['inlinecode']))
+                    position = close.end()
+                    continue
+                plain.append(fence)
+                position = fence_end
+                continue
+            if (active and text.startswith(active[-1][1], position) and position > active[-1][3]
+                    and self.follows_text(text, position)):
+                end_run()
+                closesign, flag = active.pop()[1:3]
+                weights = weights & ~flag
+                position = boundary = position + len(closesign)
+                continue
+            # A sign in the middle of a run of its character is text, unless another sign ends right in front of it
+            inside_run = position > boundary and text[position - 1] == char
+            for formatsign, closesign, flag in self.signs:
+                if inside_run or weights & flag or not text.startswith(formatsign, position):
+                    continue
+                if not self.closes(text, closesign, position + len(formatsign)):
+                    # The shorter signs starting like this one are part of it, like * of **
+                    inside_run = True
+                    continue
+                end_run()
+                position = boundary = position + len(formatsign)
+                active.append((formatsign, closesign, flag, position))
+                weights = weights | flag
+                break
+            else:
+                plain.append(char)
+                position = position + 1
+        end_run()
+        return runs
 
+    @staticmethod
+    def follows_text(text: str, position: int) -> bool:
+        """
+        :return: Whether the run of the character at position, like ** or ***, comes right after text that is not a
+            space
+        """
+        char = text[position]
+        while position > 0 and text[position - 1] == char:
+            position = position - 1
+        return position > 0 and not text[position - 1].isspace()
 
+    def closes(self, text: str, closesign: str, start: int) -> bool:
+        """
+        :return: Whether a weight whose text starts at start is closed later, around text that is not empty and
+            neither starts nor ends with a space. Otherwise its sign is plain text.
+        """
+        if start >= len(text) or text[start].isspace():
+            return False
+        close = text.find(closesign, start + 1)
+        while close >= 0 and not self.follows_text(text, close):
+            close = text.find(closesign, close + 1)
+        return close >= 0
 
+    @staticmethod
+    def text_from_runs(runs: list[tuple[str, int]], doc_text: DocText) -> DocText:
+        # A space between two runs becomes the space markitdown writes between spans, runs without one are joined
+        # with a nospace
+        space = False
+        for index, (text, weights) in enumerate(runs):
+            code = weights & WEIGHTS['inlinecode']
+            if not code and text.startswith(' '):
+                text = text[1:]
+                space = True
+            if not code and text.endswith(' ') and index + 1 < len(runs):
+                text = text[:-1]
+                following_space = True
+            else:
+                following_space = False
+            if text or code:
+                if not space:
+                    doc_text.nospace()
+                doc_text._append(Text(text, weights))
+                space = following_space
+            else:
+                space = space or following_space
+        return doc_text
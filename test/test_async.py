@@ -0,0 +1,53 @@
+import asyncio
+
+from markitdown import Document, HTML_HEAD, HTML_TAIL
+
+
+class Writer:
+    def __init__(self):
+        self.chunks = []
+        self.drained = 0
+
+    async def write(self, chunk):
+        self.chunks.append(chunk)
+
+    async def drain(self):
+        self.drained += 1
+
+
+def test_astore_document(tmp_path):
+    document = Document(file_name="report.md", file_path=str(tmp_path)).text("jag har gula byxor")
+    asyncio.run(document.astore_document())
+    assert (tmp_path / "report.md").read_text() == ' jag har gula byxor'
+
+
+def test_astore_document_incrementally(tmp_path):
+    document = Document(file_name="report.md", file_path=str(tmp_path)).text("jag har")
+    asyncio.run(document.astore_document(incremental=True))
+    document.text("gula byxor")
+    asyncio.run(document.astore_document(incremental=True))
+    assert (tmp_path / "report.md").read_text() == ' jag har gula byxor'
+
+
+def test_many_documents_stored_concurrently(tmp_path):
+    documents = [Document(file_name=f"report{i}.html", file_path=str(tmp_path)).heading(str(i)) for i in range(10)]
+
+    async def store_all():
+        await asyncio.gather(*[document.astore_document(html=True) for document in documents])
+
+    asyncio.run(store_all())
+    assert (tmp_path / "report7.html").read_text() == HTML_HEAD + '<h1>7</h1>\n' + HTML_TAIL
+
+
+def test_arender_to_writes_encoded_chunks():
+    document = Document().streaming_table(["key", "value"], lambda: (("göran", i) for i in range(10000)))
+    writer = Writer()
+    asyncio.run(document.arender_to(writer))
+    assert b''.join(writer.chunks).decode('utf-8') == document.render_document_text()
+    assert writer.drained == len(writer.chunks) > 1
+
+
+def test_arender_to_html_as_str():
+    writer = Writer()
+    asyncio.run(Document().heading("Rapport").arender_to(writer, html=True, encoding=None))
+    assert ''.join(writer.chunks) == HTML_HEAD + '<h1>Rapport</h1>\n' + HTML_TAIL
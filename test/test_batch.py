@@ -0,0 +1,28 @@
+from markitdown import Document, render_many, HTML_HEAD
+
+
+def test_render_many_stores_every_document(tmp_path):
+    documents = [Document(file_name=f"report{i}.md", file_path=str(tmp_path)).text("kund").bold(str(i))
+                 for i in range(5)]
+    results = render_many(documents, workers=2)
+    assert [result.error for result in results] == [None] * 5
+    assert [result.document for result in results] == documents
+    assert (tmp_path / "report3.md").read_text() == ' kund **3**'
+
+
+def test_render_many_as_html(tmp_path):
+    results = render_many([Document(file_name="report.html", file_path=str(tmp_path)).heading("Rapport")],
+                          workers=1, html=True)
+    assert results[0].path == str(tmp_path / "report.html")
+    assert (tmp_path / "report.html").read_text().startswith(HTML_HEAD + '<h1>Rapport</h1>')
+
+
+def test_render_many_reports_errors_per_document(tmp_path):
+    unpicklable = Document(file_name="stream.md", file_path=str(tmp_path))\
+        .streaming_table(["key"], ((key,) for key in range(3)))
+    documents = [Document().text("utan namn"), unpicklable, Document(file_name="ok.md", file_path=str(tmp_path))]
+    results = render_many(documents, workers=2)
+    assert results[0].path is None and results[0].error is not None
+    assert results[1].error is not None
+    assert results[2].error is None
+    assert not (tmp_path / "stream.md").exists()
@@ -1,4 +1,11 @@
-from markitdown import Document, DocText, FormatingException
+import io
+import mmap
+import pickle
+
+import pytest
+
+import markitdown
+from markitdown import Document, DocText, FormatingException, LineWrap, Slot
 
 
 def test_generate_document_with_text():
@@ -135,5 +142,554 @@ def test_table():
           add_row([DocText().bold("APA"),DocText().strikethrough("Kanin")])).
           add_row(["göran","gudrun"])).
           add_row([12312,3332])).get_parent().text("Nu är tabellen slut!").render_document_text()
-    assert md == "\n\n|key       |value     |\n|----------|----------|\n| "\
-           "**APA**  | ~~Kanin~~|\n|göran     |gudrun    |\n|12312     |3332      |\n\nNu är tabellen slut!"
\ No newline at end of file
+    assert md == "\n\n|key     |value     |\n|--------|----------|\n| "\
+           "**APA**| ~~Kanin~~|\n|göran   |gudrun    |\n|12312   |3332      |\n\nNu är tabellen slut!"
+
+def test_iter_render_yields_chunks_matching_full_render():
+    document = Document().heading("Rapport").text("jag har gula byxor").quote("gröna sköna sommar")\
+        .text("nu är det slut!")
+    chunks = list(document.iter_render())
+    assert len(chunks) > 1
+    assert ''.join(chunks) == document.render_document_text()
+
+
+def test_render_to_file_object():
+    import io
+    document = Document().text("jag har gula byxor").ordered_list().add_item("I").add_item("hate")
+    fp = io.StringIO()
+    document.render_to(fp)
+    assert fp.getvalue() == ' jag har gula byxor\n\n\n\n1. I\n2. hate\n'
+
+
+def test_store_document_streams_to_file(tmp_path):
+    document = Document(file_name="report.md", file_path=str(tmp_path))
+    document.text("jag har gula byxor").bold("SOM ÄR JÄTTESKÖNA")
+    document.store_document()
+    assert (tmp_path / "report.md").read_text() == ' jag har gula byxor **SOM ÄR JÄTTESKÖNA**'
+
+
+def test_rendering_twice_gives_same_document():
+    document = Document().table(["key", "value"]).add_row(["göran", "gudrun"]).get_parent()\
+        .fenced_code_block("Jag är gul").checkbox("gröna sköna sommar").text("Jag vill äta mat!")\
+        .ordered_list().add_item("First").ordered_list().add_item("Sublist first").get_parent()\
+        .add_item("Second").get_parent()
+    first = document.render_document_text()
+    assert document.render_document_text() == first
+    assert '1. First\n\t1. Sublist first\n2. Second' in first
+
+
+def test_rendering_table_does_not_change_its_rows():
+    table = Document().table(["key", "value"]).add_row(["göran", "gudrun"])
+    table.get_parent().render_document_text()
+    assert len(table.rows) == 1
+
+
+def test_rendered_blocks_are_cached():
+    table = Document().table(["key", "value"]).add_row(["göran", "gudrun"])
+    assert table._render() is table._render()
+
+
+def test_cache_is_invalidated_by_mutating_nested_text():
+    cell = DocText().nospace("gudrun")
+    table = Document().table(["key", "value"]).add_row(["göran", cell])
+    document = table.get_parent().quote(DocText().text("gröna"))
+    document.render_document_text()
+    cell.bold()
+    table.add_row(["greta", "gris"])
+    assert document.render_document_text() == "\n\n|key  |value     |\n|-----|----------|\n"\
+        "|göran|**gudrun**|\n|greta|gris      |\n\n\n\n>  gröna"
+
+
+def test_cache_is_invalidated_by_adding_items_to_nested_list():
+    ordered_list = Document().ordered_list().add_item("First")
+    sublist = ordered_list.unordered_list().add_item("Banana")
+    document = ordered_list.get_parent()
+    document.render_document_text()
+    sublist.add_item("Chocklate")
+    assert document.render_document_text() == '\n\n1. First\n\t- Banana\n\t- Chocklate\n'
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_cache_of_deep_list_is_invalidated_after_repeated_renders(workers):
+    document = Document()
+    deepest = document.unordered_list().add_item("a")
+    for _ in range(3):
+        deepest = deepest.unordered_list().add_item("b")
+    document.render_document_text(workers)
+    deepest.items[0].bold()
+    assert document.render_document_text(workers).endswith('\t\t\t- **b**\n')
+    deepest.items[0].italic()
+    deepest.add_item("c")
+    assert document.render_document_text(workers).endswith('\t\t\t- ***b***\n\t\t\t- c\n')
+
+
+def test_cache_is_invalidated_by_adding_weight_to_checkbox_text():
+    document = Document().checkbox("gröna sköna sommar")
+    document.render_document_text()
+    document.bold()
+    assert document.render_document_text() == ' \n - [ ]  **gröna sköna sommar**'
+
+
+def test_cache_is_invalidated_by_setting_attributes():
+    document = Document().checkbox("klar").text("a b c")
+    document.render_document_text()
+    document.md_objects[0].checked = True
+    document.md_objects[1].wrap = LineWrap(words=2)
+    assert document.render_document_text() == ' \n - [x]  klar\n\na b \nc'
+
+
+def test_streaming_does_not_fill_caches(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path)).quote("citat")
+    document.table(["a"]).add_row([DocText().nospace().bold("b")])
+    document.store_document()
+    document.render_to(io.StringIO())
+    assert [md._rendered for md in document.md_objects] == [None, None]
+    assert document.md_objects[1].columns[0][0]._rendered is None
+    md = document.render_document_text()
+    assert document.md_objects[1]._rendered is not None
+    assert (tmp_path / "rapport.md").read_text() == md
+
+
+def test_table_columns_have_their_own_width():
+    md = Document().table(["a", "longer header"]).add_row(["a much longer cell", "b"]).get_parent()\
+        .render_document_text()
+    assert md == "\n\n|a                 |longer header|\n|------------------|-------------|\n"\
+                 "|a much longer cell|b            |\n\n"
+
+
+def test_table_renders_each_cell_once(monkeypatch):
+    renders = []
+    render_markdown = DocText._render_markdown
+
+    def counting_render_markdown(self, leading_nospace=False):
+        renders.append(self)
+        return render_markdown(self, leading_nospace)
+
+    monkeypatch.setattr(DocText, '_render_markdown', counting_render_markdown)
+    Document().table(["key", "value"]).add_row([DocText().bold("göran"), DocText().italic("gudrun")])\
+        .add_row([DocText().bold("greta"), DocText().italic("gris")]).get_parent().render_document_text()
+    assert len(renders) == 4
+
+
+def test_table_add_rows():
+    table = Document().table(["key", "value"]).add_rows(iter([("göran", 1), ("greta", 22)]))
+    assert table.rows == [["göran", "1"], ["greta", "22"]]
+    assert table.get_parent().render_document_text() == "\n\n|key  |value|\n|-----|-----|\n"\
+                                                        "|göran|1    |\n|greta|22   |\n\n"
+
+
+def test_table_add_rows_with_wrong_size():
+    try:
+        Document().table(["key", "value"]).add_rows([("göran", 1), ("greta",)])
+        assert False
+    except FormatingException:
+        assert True
+
+
+def test_table_from_columns_with_formated_cell():
+    document = Document().table_from_columns({"key": ["göran", "greta"], "value": [1, 22]}).get_parent()
+    document.md_objects[0].cell(1, 0).bold()
+    assert document.render_document_text() == "\n\n|key      |value|\n|---------|-----|\n"\
+                                              "|göran    |1    |\n|**greta**|22   |\n\n"
+
+
+def test_streaming_table_compact():
+    rows = (("göran", number) for number in range(2))
+    md = Document().streaming_table(["key", "value"], rows).text("Nu är tabellen slut!").render_document_text()
+    assert md == "\n\n|key|value|\n|---|-----|\n|göran|0|\n|göran|1|\n\nNu är tabellen slut!"
+
+
+def test_streaming_table_fixed_width_from_function_renders_again():
+    document = Document().streaming_table(["key", DocText().nospace().bold("value")],
+                                          lambda: [("göran", 1)], width=[6, 9])
+    md = "\n\n|key   |**value**|\n|------|---------|\n|göran |1        |\n\n"
+    assert document.render_document_text() == md
+    assert document.render_document_text() == md
+
+
+def test_streaming_table_renders_texts_as_cells_without_changing_them():
+    header = DocText().nospace().bold("värde")
+    cell = DocText().nospace().text("a b c d e f g h i j k l|m")
+    document = Document().streaming_table(["key", header], lambda: [("göran", cell)])
+    assert header.parent_feature is markitdown.Table
+    assert document.render_document_text() == "\n\n|key|**värde**|\n|---|---------|\n" \
+                                              "|göran|a b c d e f g h i j k l&#124;m|\n\n"
+    assert cell.parent_feature is None
+
+
+def test_streaming_table_is_written_row_by_row():
+    import io
+
+    class Recorder(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.writes = 0
+
+        def write(self, chunk):
+            self.writes += 1
+            return super().write(chunk)
+
+    fp = Recorder()
+    Document().streaming_table(["key"], ((key,) for key in range(100)), width=5).render_to(fp)
+    assert fp.writes == 102
+
+
+def test_document_weight_by_name():
+    md = Document().text("jag har gula byxor").weight('important').weight('bold', "SOM ÄR JÄTTESKÖNA")\
+        .render_document_text()
+    assert md == ' ==jag har gula byxor== **SOM ÄR JÄTTESKÖNA**'
+
+
+def test_parallel_render_is_identical_to_serial_render():
+    document = Document().heading("Rapport").text("jag har kollat på alla avsnitt av friends!")
+    for i in range(20):
+        document.table(["key", "value"]).add_rows([("göran", i), ("greta", i * 1000)])
+        document.checkbox("gröna sköna sommar").text("Jag vill äta mat!").quote(DocText().bold("greta"))
+    document.streaming_table(["key"], lambda: [("göran",)])
+    document.ordered_list().add_item("First").unordered_list().add_item("Banana").get_parent().add_item("Second")
+    assert document.render_document_text(workers=2) == document.render_document_text()
+
+
+def test_parallel_render_fills_block_caches():
+    document = Document().table(["key", "value"]).add_row(["göran", "gudrun"]).get_parent()
+    md = document.render_document_text(workers=2)
+    assert document.md_objects[0]._rendered is not None
+    assert document.render_document_text() == md
+
+
+def test_table_cells_and_headings_are_escaped_on_one_line():
+    md = Document().heading("Rapport #1").table(["a|b"]).add_row(["rad\nett"]).get_parent().render_document_text()
+    assert md == '\n# Rapport &#35;1\n\n\n|a&#124;b|\n|--------|\n|rad ett |\n\n'
+
+
+def test_inlinecode_escapes_pipes_only_in_table_cells():
+    document = Document()
+    document.table(["h"]).add_row([DocText().nospace().inlinecode("a|b")])
+    document.text("x").inlinecode("p|q")
+    assert document.render_document_text() == '\n\n|h     |\n|------|\n|`a\\|b`|\n\nx `p|q`'
+
+
+def test_fenced_code_block_is_not_escaped_and_keeps_inner_fences():
+    md = Document().fenced_code_block("a * b\n```\nc").render_document_text()
+    assert md == '\n\n````\na * b\n```\nc\n````\n'
+
+
+def test_list_markers_at_the_start_of_a_line_are_escaped():
+    assert Document().text("1. not a list").render_document_text() == ' 1&#46; not a list'
+    assert Document().text("- not a list").render_document_text() == ' &#45; not a list'
+    assert Document().text("1.5 million -5").render_document_text() == ' 1.5 million -5'
+    md = DocText(wrap=LineWrap(words=3)).text("a b - c 2. d")._render()
+    assert md == ' a b \n&#45; c 2. \nd'
+    assert DocText(wrap=LineWrap()).nospace().text("2").nospace().text("3) a")._render() == '23&#41; a'
+
+
+def test_code_span_is_not_broken_in_front_of_a_marker():
+    md = DocText(wrap=LineWrap(width=6)).nospace().inlinecode("ab cd - e f")._render()
+    assert md == '`ab cd - e f`'
+
+
+def test_touching_code_spans_are_separated():
+    assert DocText().nospace().inlinecode("a").nospace().inlinecode("b")._render() == '`a`<!---->`b`'
+
+
+def test_load_text_starting_like_a_list(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path))
+    document.text("- not a list").heading("Kyla").text("1. not a list").nospace().inlinecode("a").nospace().inlinecode("b")
+    document.store_document()
+    loaded = Document.load(str(tmp_path / "rapport.md"))
+    assert [type(md).__name__ for md in loaded.md_objects] == ['DocText', 'Heading', 'DocText']
+    assert loaded.render_document_text() == document.render_document_text()
+
+
+def test_document_wrap_applies_to_text_it_creates():
+    text = " ".join(["ord"] * 12)
+    document = Document(wrap=LineWrap())
+    md = document.text(text).quote(text).unordered_list().add_item(text).get_parent().render_document_text()
+    assert md.count(text) == 3
+
+
+def test_deeply_nested_list_renders_without_recursion():
+    document = Document()
+    md_list = document.ordered_list().add_item("root")
+    for _ in range(3000):
+        md_list = md_list.ordered_list().add_item("child")
+    md = document.render_document_text()
+    assert md.count('1. child\n') == 3000
+    assert md.endswith('\t' * 3000 + '1. child\n')
+    html = document.render_html()
+    assert html.count('<ol>') == html.count('</ol>') == 3001
+    md_list.add_item("last")
+    assert document.render_document_text().endswith('\t' * 3000 + '2. last\n')
+
+
+def test_lazy_content_is_produced_when_rendered():
+    produced = []
+
+    def lines():
+        produced.append(True)
+        yield "jag har"
+        yield "gula byxor"
+
+    document = (Document().text(lines).bold("nu").unordered_list(lambda: ["ett", DocText().bold("två")])
+                .add_item("tre").get_parent().fenced_code_block(lines).table(["a"], lambda: [[1], [2]]).get_parent())
+    assert produced == []
+    md = document.render_document_text()
+    assert md == (' jag har gula byxor **nu**\n\n- ett\n- **två**\n- tre\n\n\n\n```\njag har\ngula byxor\n```\n'
+                  '\n\n|a|\n|---|\n|1|\n|2|\n\n')
+    assert len(produced) == 2
+    assert document.render_document_text() == md
+
+
+def test_lazy_text_and_items_follow_the_document():
+    assert Document().heading("x").text(lambda: "a").render_document_text() == \
+        Document().heading("x").text("a").render_document_text() == '\n# x\na'
+    document = Document(wrap=LineWrap(words=2)).unordered_list(lambda: ["a b c"]).get_parent()
+    assert document.render_document_text() == '\n\n- a \nb c\n'
+
+
+def test_table_returns_the_table_for_eager_and_lazy_rows():
+    document = Document()
+    assert document.table(["a"], [[1]]).get_parent() is document
+    assert document.table(["a"], lambda: [[2]]).get_parent() is document
+    assert document.render_document_text() == '\n\n|a|\n|-|\n|1|\n\n\n\n|a|\n|---|\n|2|\n\n'
+
+
+def test_weights_after_lazy_text_apply_to_the_produced_text():
+    assert Document().text(lambda: ["a", "b"]).bold().italic().text("c").render_document_text() == \
+        ' ***a*** ***b*** c'
+    assert Document().text(lambda: "a").bold().inlinecode().render_document_text() == ' `a`'
+    with pytest.raises(FormatingException):
+        Document().text(lambda: "a").bold().bold()
+
+
+def test_lazy_content_from_generator_is_streamed():
+    document = Document().text(text for text in ["a", "b"]).table(["x"], ([row] for row in range(3))).get_parent()
+    chunks = list(document.iter_render())
+    assert len(chunks) > 5
+    assert ''.join(chunks) == ' a b\n\n|x|\n|---|\n|0|\n|1|\n|2|\n\n'
+    assert '<p>a b</p>' in Document().text(iter(["a", "b"])).render_html()
+
+
+def test_raw_code_block_from_file_is_copied_into_stored_document(tmp_path):
+    log = tmp_path / "log.txt"
+    log.write_bytes("rad 1 <ok>\nrad ```2``` ✓".encode())
+    document = Document(file_name="rapport.md", file_path=str(tmp_path)).text("Logg").raw_code_block(str(log))
+    expected = ' Logg\n\n````\nrad 1 <ok>\nrad ```2``` ✓\n````\n'
+    assert document.render_document_text() == expected
+    with open(tmp_path / "rapport.md", 'w', encoding='utf-8') as file:
+        document.render_to(file)
+    assert (tmp_path / "rapport.md").read_bytes() == expected.encode()
+    assert '<pre><code>rad 1 &lt;ok&gt;\nrad ```2``` ✓</code></pre>' in document.render_html()
+
+
+def test_raw_code_block_from_buffers(tmp_path):
+    assert Document().raw_code_block(memoryview(b"a\nb")).render_document_text() == '\n\n```\na\nb\n```\n'
+    with mmap.mmap(-1, 3) as mapped:
+        mapped.write("å".encode('latin-1') + b"\nc")
+        document = Document().raw_code_block(mapped, encoding='latin-1')
+        output = io.StringIO()
+        document.render_to(output)
+        assert output.getvalue() == '\n\n```\nå\nc\n```\n'
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert Document().raw_code_block(empty).render_document_text() == '\n\n```\n\n```\n'
+
+
+def test_compiled_template_fills_slots():
+    document = (Document().heading("Rapport för", 2).text("Vecka").bold(Slot("vecka"))
+                .table(["Namn", "Antal"]).add_row(["Äpplen", Slot("antal")]).get_parent())
+    template = document.compile()
+    md = template.render(vecka=12, antal="3|4")
+    assert md.startswith('\n## Rapport för\nVecka **12**\n')
+    assert '|Äpplen|3&#124;4' in md
+    assert '**<b>**' not in template.render({"vecka": "<b>", "antal": 1})
+    assert '**&#60;b&#62;**' in template.render({"vecka": "<b>", "antal": 1})
+    with pytest.raises(FormatingException):
+        template.render(vecka=1)
+
+
+def test_slot_survives_pickling_and_worker_processes():
+    assert pickle.loads(pickle.dumps(Slot("namn"))) == Slot("namn")
+    assert pickle.loads(pickle.dumps(Slot("namn"))).name == "namn"
+    document = Document().text("Hej").bold(Slot("namn")).text("a").text("b")
+    document.render_document_text(workers=2)
+    assert document.compile().render(namn="du").startswith(' Hej **du**')
+
+
+def test_compiled_template_escapes_slots_by_context():
+    document = Document().text("a").inlinecode(Slot("k")).fenced_code_block(Slot("c"))
+    document.table(["h"]).add_row([DocText().nospace().inlinecode(Slot("t"))])
+    md = document.compile().render(k="x_y", c="a*b\nc", t="p|q")
+    assert ' `x_y`' in md
+    assert '```\na*b\nc\n```' in md
+    assert '`p\\|q`' in md
+    with pytest.raises(FormatingException):
+        document.compile().render(k="`", c="", t="")
+    with pytest.raises(FormatingException):
+        document.compile().render(k="", c="```", t="")
+    with pytest.raises(FormatingException):
+        document.compile().render(k="", c=DocText().bold("a*b"), t="")
+
+
+def test_compiled_template_renders_doctext_for_the_slot():
+    document = Document().text("a").bold(Slot("p")).table(["h"]).add_row([Slot("v")]).get_parent()
+    document.render_document_text()
+    md = document.compile().render(p=DocText().nospace().text("b"),
+                                   v=DocText().text("a b c d e f g h i j k l").italic("m"))
+    assert md == ' a **b**\n\n|h    |\n|-----|\n|a b c d e f g h i j k l *m*|\n\n'
+
+
+def test_escaping_does_not_mark_slots_outside_templates():
+    assert DocText().text("a\x02b")._render() == ' a\x02b'
+    assert Document().heading("a\x02b").render_document_text() == '\n# a\x02b\n'
+    document = Document().text("a").bold(Slot("p"))
+    document.compile()
+    assert document.render_document_text() == ' a **' + Slot("p") + '**'
+
+
+def test_compiled_html_template():
+    template = Document().text("Hej").bold(Slot("namn")).compile(html=True)
+    assert '<p>Hej <strong>a &lt; b</strong></p>' in template.render(namn="a < b")
+    assert '<strong><em>c</em></strong>' in template.render(namn=DocText().nospace().italic("c"))
+
+
+def test_serialized_document_renders_the_same():
+    document = Document(file_name="rapport.md", wrap=LineWrap(width=40))
+    document.heading("Rapport").text("Hej").bold("världen").nospace().italic("!").checkbox("klar", True).text("efter")
+    document.quote("citat").fenced_code_block("a = 1")
+    md_list = document.ordered_list().add_item("ett").unordered_list().add_item(DocText().inlinecode("två"))
+    md_list.get_parent().add_item("tre")
+    document.table(["a", "b"]).add_row([1, DocText().nospace().bold("x")]).get_parent().horizontal_rule()
+    data = markitdown.dumps(document)
+    loaded = markitdown.loads(data)
+    assert loaded.file_name == "rapport.md"
+    assert loaded.render_document_text() == document.render_document_text()
+    assert loaded.render_html() == document.render_html()
+    serialized = markitdown.SerializedDocument(data)
+    assert ''.join(serialized.render_block(i) for i in range(len(serialized))) == document.render_document_text()
+
+
+def test_serialization_rejects_lazy_content_and_other_formats():
+    with pytest.raises(FormatingException):
+        markitdown.dumps(Document().text(lambda: "lat"))
+    with pytest.raises(FormatingException):
+        markitdown.loads(b"not a document")
+
+
+def test_incremental_store_appends_new_blocks(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path))
+    path = tmp_path / "rapport.md"
+    document.heading("Rapport").text("Första")
+    document.store_document(incremental=True)
+    assert path.read_text() == document.render_document_text()
+    # Only the end of the file is written again, so the start is left as it is
+    path.write_text(path.read_text().replace("Rapport", "RAPPORT"))
+    document.text("mer").quote("citat").checkbox("uppgift").text("klar")
+    document.store_document(incremental=True)
+    assert path.read_text() == document.render_document_text().replace("Rapport", "RAPPORT")
+    document.text("igen")
+    document.store_document(incremental=True)
+    assert path.read_text() == document.render_document_text().replace("Rapport", "RAPPORT")
+    # Ending with a list changes earlier separators, the whole file is rewritten
+    document.unordered_list().add_item("punkt")
+    document.store_document(incremental=True)
+    assert path.read_text() == document.render_document_text()
+
+
+def test_incremental_store_writes_a_lazy_last_block_again(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path)).heading("Rapport").text(lambda: "lat")
+    document.store_document(incremental=True)
+    document.text("z")
+    document.store_document(incremental=True)
+    assert (tmp_path / "rapport.md").read_text() == document.render_document_text() == '\n# Rapport\nlat z'
+
+
+def test_incremental_html_store_rewrites_body_tail(tmp_path):
+    document = Document(file_name="rapport.html", file_path=str(tmp_path)).text("Första")
+    path = tmp_path / "rapport.html"
+    document.store_document(html=True, incremental=True)
+    assert path.read_text() == document.render_html()
+    document.bold("fet").table(["a"]).add_row([1]).get_parent().unordered_list().add_item("punkt")
+    document.store_document(html=True, incremental=True)
+    assert path.read_text() == document.render_html()
+    document.md_objects[-1].add_item("till")
+    document.store_document(html=True, incremental=True)
+    assert path.read_text() == document.render_html()
+
+
+def test_load_stored_document_renders_the_same(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path))
+    document.heading("Rapport #1").text("Hej").bold("världen").nospace().italic("!").text("a*b " + "ord " * 15)
+    document.checkbox("klar", True).checkbox("inte").text("efter").quote("citat " * 14)
+    document.fenced_code_block("a = 1\n```\nb")
+    md_list = document.ordered_list().add_item("ett").unordered_list().add_item(DocText().inlinecode("två|x"))
+    md_list.get_parent().add_item("tre")
+    document.table(["a", "b"]).add_row([1, DocText().nospace().bold("x")]).add_row(["p|q", "s"]).get_parent()
+    document.heading("Slut", 2).horizontal_rule().text("sist").important("viktigt")
+    document.store_document()
+    loaded = Document.load(str(tmp_path / "rapport.md"))
+    assert loaded.render_document_text() == document.render_document_text()
+    assert loaded.md_objects[-1].md_objects[-1].weights == DocText().bold("a").md_objects[0].weights << 3
+    loaded.text("tillagd").store_document()
+    assert (tmp_path / "rapport.md").read_text().endswith("\nsist ==viktigt== tillagd")
+
+
+def test_load_common_markdown(tmp_path):
+    path = tmp_path / "vanlig.md"
+    path.write_text("## Titel\n\nEn *kursiv*\nrad och `kod`.\n\n* a\n* b\n  1. c\n\n| x | y |\n|:--|--:|\n| 1 | **2** |\n")
+    document = Document.load(str(path))
+    assert [type(md).__name__ for md in document.md_objects] == ['Heading', 'DocText', 'UnorderedList', 'Table']
+    assert document.md_objects[1]._render() == 'En *kursiv* rad och `kod`.'
+    assert document.md_objects[2].items[2].items[0]._render() == ' c'
+    assert document.md_objects[3].rows == [['1', document.md_objects[3].cell(0, 1)]]
+
+
+def test_load_keeps_unmatched_weight_signs_as_text(tmp_path):
+    path = tmp_path / "tecken.md"
+    path.write_text("**a and a ** b and 2 * 3 * 4 but *b*\n")
+    text = Document.load(str(path)).md_objects[0]
+    assert [(span.text_str, span.weights) for span in text.md_objects if span.text_str] == \
+        [("**a and a ** b and 2 * 3 * 4 but", 0), ("b", markitdown.WEIGHTS['italic'])]
+
+
+def test_render_stats_per_block_type(tmp_path):
+    stats = markitdown.RenderStats()
+    document = Document(file_name="rapport.html", file_path=str(tmp_path), stats=stats)
+    document.text("Hej").table(["a"]).add_rows([[1], [2]]).get_parent().checkbox("klar").text("efter")
+    md = document.render_document_text()
+    document.store_document(html=True)
+    result = stats.as_dict()
+    assert result['blocks']['markdown']['DocText']['count'] == 2
+    assert result['blocks']['markdown']['Table']['count'] == 1
+    assert result['blocks']['markdown']['Table']['characters'] == len(document.md_objects[1]._render())
+    assert sum(block['characters'] for block in result['blocks']['markdown'].values()) <= len(md)
+    assert result['blocks']['html']['TextCheckbox']['count'] == 1
+    assert result['io']['characters'] == len(document.render_html())
+    assert result['io']['seconds'] > 0
+
+
+def test_render_stats_count_raw_code_block_copy_as_io(tmp_path):
+    code = tmp_path / "kod.py"
+    code.write_bytes(b"print('hej')\n" * 1000)
+    stats = markitdown.RenderStats()
+    document = Document(file_name="rapport.md", file_path=str(tmp_path), stats=stats).raw_code_block(code)
+    document.store_document()
+    result = stats.as_dict()
+    assert result['io']['characters'] == (tmp_path / "rapport.md").stat().st_size
+    assert result['blocks']['markdown']['RawCodeBlock']['characters'] == result['io']['characters']
+
+
+def test_rendering_without_stats_is_not_measured():
+    document = Document().text("Hej")
+    assert document.stats is None
+    assert list(document.iter_render()) == [' Hej']
+
+
+def test_load_wrapped_line_starting_like_a_list_item(tmp_path):
+    document = Document(file_name="rapport.md", file_path=str(tmp_path))
+    document.text("we saw a b c d e f g 3.5 million users").heading("Kyla").text("-5 degrees and a b c d e f g - 4")
+    document.unordered_list().add_item("ett").add_item(DocText().nospace().text("två"))
+    document.store_document()
+    loaded = Document.load(str(tmp_path / "rapport.md"))
+    assert [type(md).__name__ for md in loaded.md_objects] == ['DocText', 'Heading', 'DocText', 'UnorderedList']
+    assert loaded.render_document_text() == document.render_document_text()
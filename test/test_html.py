@@ -0,0 +1,38 @@
+from markitdown import Document, DocText, HTML_HEAD, HTML_TAIL
+
+
+def test_text_with_weights():
+    html = ''.join(Document().text("jag har <gula>").bold("byxor").nospace("!").italic().iter_render_html())
+    assert html == '<p>jag har &lt;gula&gt; <strong>byxor</strong><em>!</em></p>\n'
+
+
+def test_table():
+    html = ''.join(Document().table(["key", "value"]).add_row([DocText().bold("APA"), 12]).get_parent()
+                   .iter_render_html())
+    assert html == ('<table>\n<thead>\n<tr><th>key</th><th>value</th></tr>\n</thead>\n<tbody>\n'
+                    '<tr><td><strong>APA</strong></td><td>12</td></tr>\n</tbody>\n</table>\n')
+
+
+def test_nested_list():
+    html = ''.join(Document().ordered_list().add_item("I").unordered_list().add_item("Banana").get_parent()
+                   .add_item("hate").iter_render_html())
+    assert html == '<ol>\n<li>I\n<ul>\n<li>Banana</li>\n</ul>\n</li>\n<li>hate</li>\n</ol>\n'
+
+
+def test_quote_code_block_and_checkbox():
+    html = ''.join(Document().quote("gröna").fenced_code_block("a < b").checkbox("klar", checked=True)
+                   .iter_render_html())
+    assert html == ('<blockquote><p>gröna</p></blockquote>\n<pre><code>a &lt; b</code></pre>\n'
+                    '<p class="checkbox"><input type="checkbox" disabled checked> klar</p>\n')
+
+
+def test_store_document_as_html(tmp_path):
+    document = Document(file_name="report.html", file_path=str(tmp_path)).heading("Rapport", 2)
+    document.store_document(html=True)
+    assert (tmp_path / "report.html").read_text() == HTML_HEAD + '<h2>Rapport</h2>\n' + HTML_TAIL
+
+
+def test_store_document_as_pretty_html(tmp_path):
+    document = Document(file_name="report.html", file_path=str(tmp_path)).heading("Rapport", 2)
+    document.store_document(html=True, pretty=True)
+    assert '<h2>\n   Rapport\n  </h2>' in (tmp_path / "report.html").read_text()
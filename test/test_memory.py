@@ -0,0 +1,42 @@
+import tracemalloc
+
+from markitdown import Document, DocText, NoSpace, FormatingException
+
+SPANS = 100000
+BYTES_PER_SPAN_BUDGET = 80
+
+
+def test_bytes_per_span_within_budget():
+    text = "byxor"
+    doc_text = DocText()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(SPANS):
+            doc_text.bold(text)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert (after - before) / SPANS <= BYTES_PER_SPAN_BUDGET
+
+
+def test_model_objects_have_no_instance_dict():
+    document = Document().text("jag har gula byxor").quote("gröna").checkbox("sommar")
+    table = document.table(["key"]).add_row(["göran"])
+    sublist = document.ordered_list().add_item("I").unordered_list().add_item("hate")
+    for obj in [document, table, sublist, sublist.get_parent(), *document.md_objects,
+                *document.md_objects[0].md_objects]:
+        assert not hasattr(obj, '__dict__')
+
+
+def test_list_still_delegates_to_document():
+    md = Document().ordered_list().add_item("I").text("jag har gula byxor").render_document_text()
+    assert md == '\n\n1. I\n\njag har gula byxor'
+
+
+def test_nospace_still_rejects_document_functions():
+    try:
+        NoSpace().quote
+        assert False
+    except FormatingException as e:
+        assert str(e) == 'Cannot add quote to nospace!'
@@ -1,4 +1,5 @@
-from markitdown import Text, BoldText, ItalicText, InlinecodeText, StrikethroughText, FormatingException, DocText
+import pytest
+from markitdown import Text, BoldText, ItalicText, InlinecodeText, StrikethroughText, FormatingException, DocText, LineWrap
 
 
 def test_bold():
@@ -100,3 +101,114 @@ def test_doctest_with_nospace_containing_text():
 def test_text_bold():
     md = DocText().text("Jag har gröna byxor").bold().italic().nospace().bold("korv").nospace("göran").strikethrough().inlinecode()._render()
     assert md == " ***Jag har gröna byxor*****korv**`göran`"
+
+@pytest.fixture
+def weights(monkeypatch):
+    """
+    Restores the registered weights after the test.
+    """
+    import markitdown
+    for name in ('WEIGHTS', '_AFFIXES', '_HTML_AFFIXES'):
+        monkeypatch.setattr(markitdown, name, getattr(markitdown, name).copy())
+    monkeypatch.setattr(markitdown, '_NESTING', list(markitdown._NESTING))
+
+def test_register_weight_with_closesign(weights):
+    from markitdown import register_weight
+    register_weight('sub', '<sub>', '</sub>')
+    md = DocText().text("H").nospace("2").weight('sub').nospace("O").bold()._render()
+    assert md == ' H<sub>2</sub>**O**'
+    assert Text("hoppla").weight('sub').bold()._render() == '**<sub>hoppla</sub>**'
+    assert Text("hoppla").inlinecode().weight('sub')._render() == '<sub>`hoppla`</sub>'
+
+def test_changing_a_span_drops_the_cache_of_its_text():
+    doc_text = DocText(wrap=LineWrap()).text("hej").bold("då")
+    assert doc_text._render() == ' hej **då**'
+    doc_text.md_objects[0].update_text_str("hallå")
+    assert doc_text._render() == ' hallå **då**'
+    doc_text.md_objects[0].italic()
+    assert doc_text._render() == ' *hallå* **då**'
+
+def test_register_existing_weight():
+    from markitdown import register_weight
+    try:
+        register_weight('bold', '__')
+        assert False
+    except FormatingException as e:
+        assert str(e) == 'There is already a weight named bold'
+
+def test_unknown_weight():
+    try:
+        DocText().text("hoppla").weight('blink')
+        assert False
+    except FormatingException as e:
+        assert str(e) == 'There is no weight named blink'
+
+def test_weights_are_nested_in_fixed_order():
+    assert Text("hoppla").strikethrough().bold()._render() == '**~~hoppla~~**'
+    assert Text("hoppla").important().italic()._render() == '*==hoppla==*'
+
+def test_span_is_single_object_with_weight_flags():
+    span = Text("hoppla")
+    assert span.bold().italic() is span
+    assert not hasattr(span, '__dict__')
+    assert span.weights == BoldText("hoppla").weights | ItalicText("hoppla").weights
+
+def test_text_is_escaped():
+    md = DocText().text("2*3_000 [x] <b> a|b ~c~ #1 `d` \\").bold("**")._render()
+    assert md == ' 2&#42;3&#95;000 &#91;x&#93; &#60;b&#62; a&#124;b &#126;c&#126; &#35;1 &#96;d&#96; &#92; **&#42;&#42;**'
+
+def test_inlinecode_is_escaped_as_code_span():
+    assert DocText().nospace().inlinecode("a*b")._render() == '`a*b`'
+    assert DocText().nospace().inlinecode("a`b``c")._render() == '``` a`b``c ```'
+    assert DocText().nospace().inlinecode("a|b")._render() == '`a|b`'
+
+def test_ampersand_and_equals_are_escaped():
+    assert DocText().nospace().text("AT&amp;T ==x==")._render() == 'AT&#38;amp;T &#61;&#61;x&#61;&#61;'
+
+
+def test_wrap_by_words_is_default():
+    md = DocText().text("a b c d e f g h i j k l").bold("m")._render()
+    assert md == ' a b c d e f g h i \nj k l **m**'
+
+def test_wrap_by_words_across_spans():
+    md = DocText(wrap=LineWrap(words=2)).text("a b").bold("c d").text("e")._render()
+    assert md == ' a \nb **c \nd** e'
+
+def test_wrap_by_width():
+    md = DocText(wrap=LineWrap(width=10)).text("jag har gula").bold("byxor").text("ochenväldigtlångtord x")._render()
+    assert md == ' jag har\ngula\n**byxor**\nochenväldigtlångtord\nx'
+
+def test_wrap_by_width_passes_fitting_pieces_through():
+    pieces = list(LineWrap(width=100).iter_wrap([" jag har", " gula byxor", " och", "**korv**"]))
+    assert ''.join(pieces) == " jag har gula byxor och**korv**"
+    assert ''.join(LineWrap(width=11).iter_wrap([" jag har", " gula byxor"])) == " jag har\ngula byxor"
+
+def test_no_wrap():
+    text = " ".join(["ord"] * 30)
+    assert DocText(wrap=LineWrap()).text(text)._render() == ' ' + text
+
+def test_wrap_needs_words_or_width_not_both():
+    with pytest.raises(FormatingException):
+        LineWrap(words=10, width=80)
+
+def test_nospace_is_resolved_when_spans_are_added():
+    doc_text = DocText(wrap=LineWrap()).nospace("(").text("a").nospace().bold("b").text("c")
+    assert doc_text._render() == '( a**b** c'
+    assert doc_text._render(leading_nospace=True) == '(a**b** c'
+
+def test_spans_keep_their_separator_when_md_objects_is_changed():
+    from markitdown import NoSpace
+    doc_text = DocText(wrap=LineWrap()).text("a").nospace().bold("b")
+    doc_text.md_objects.insert(0, NoSpace())
+    doc_text.md_objects.append(Text("c"))
+    assert doc_text._render() == ' a**b** c'
+    doc_text = DocText(wrap=LineWrap()).text("a").nospace().bold("b")
+    del doc_text.md_objects[0]
+    assert doc_text._render() == '**b**'
+    assert doc_text._render(leading_nospace=True) == '**b**'
+
+def test_paragraph_with_many_spans():
+    doc_text = DocText(wrap=LineWrap())
+    for _ in range(20000):
+        doc_text.text("a").nospace().bold("b")
+    assert doc_text._render() == ' a**b**' * 20000